@@ -8,6 +8,7 @@ from alembic import context
 
 from src.dao.database import Base, DATABASE_URL
 from src.users.models import User  # noqa
+from src.ticket.models import ChatSyncState  # noqa
 
 
 config = context.config
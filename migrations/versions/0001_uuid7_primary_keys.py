@@ -0,0 +1,64 @@
+"""uuid7 primary keys
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Функция uuid_generate_v7() и серверные умолчания id для users и ticket.
+Существующие строки с UUIDv4 не меняются: оба варианта - обычные
+значения типа uuid, новые ключи просто начинают расти во времени.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+UUID7_FUNCTION = """
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+BEGIN
+    RETURN encode(
+        set_bit(
+            set_bit(
+                overlay(
+                    uuid_send(gen_random_uuid())
+                    placing substring(
+                        int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint)
+                        FROM 3
+                    )
+                    FROM 1 FOR 6
+                ),
+                52, 1
+            ),
+            53, 1
+        ),
+        'hex'
+    )::uuid;
+END
+$$ LANGUAGE plpgsql VOLATILE
+"""
+
+TABLES = ("users", "ticket")
+
+
+def upgrade() -> None:
+    op.execute(UUID7_FUNCTION)
+    # Таблицы могли быть ещё не созданы (их создаёт приложение при старте)
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if inspector.has_table(table):
+            op.alter_column(
+                table, "id", server_default=sa.text("uuid_generate_v7()")
+            )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if inspector.has_table(table):
+            op.alter_column(table, "id", server_default=None)
+    op.execute("DROP FUNCTION IF EXISTS uuid_generate_v7()")
@@ -0,0 +1,78 @@
+"""ticket indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Составные индексы ticket под обращения DAO, индекс users.bitrix_id
+и удаление лишних индексов ix_*_id, дублирующих первичные ключи.
+Индексы строятся CONCURRENTLY, чтобы не блокировать вставки в ticket.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+TICKET_INDEXES = {
+    "ix_ticket_chat_id_user_id": ["chat_id", "user_id"],
+    "ix_ticket_user_id_time_open": ["user_id", "time_open"],
+    "ix_ticket_status_time_open": ["status", "time_open"],
+    "ix_ticket_time_open_id": ["time_open", "id"],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    has_users = inspector.has_table("users")
+    has_ticket = inspector.has_table("ticket")
+
+    with op.get_context().autocommit_block():
+        if has_users:
+            op.drop_index(
+                "ix_users_id", table_name="users",
+                if_exists=True, postgresql_concurrently=True,
+            )
+            op.create_index(
+                "ix_users_bitrix_id", "users", ["bitrix_id"],
+                if_not_exists=True, postgresql_concurrently=True,
+            )
+        if has_ticket:
+            op.drop_index(
+                "ix_ticket_id", table_name="ticket",
+                if_exists=True, postgresql_concurrently=True,
+            )
+            for name, columns in TICKET_INDEXES.items():
+                op.create_index(
+                    name, "ticket", columns,
+                    if_not_exists=True, postgresql_concurrently=True,
+                )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    with op.get_context().autocommit_block():
+        if inspector.has_table("ticket"):
+            for name in TICKET_INDEXES:
+                op.drop_index(
+                    name, table_name="ticket",
+                    if_exists=True, postgresql_concurrently=True,
+                )
+            op.create_index(
+                "ix_ticket_id", "ticket", ["id"], unique=True,
+                if_not_exists=True, postgresql_concurrently=True,
+            )
+        if inspector.has_table("users"):
+            op.drop_index(
+                "ix_users_bitrix_id", table_name="users",
+                if_exists=True, postgresql_concurrently=True,
+            )
+            op.create_index(
+                "ix_users_id", "users", ["id"], unique=True,
+                if_not_exists=True, postgresql_concurrently=True,
+            )
@@ -0,0 +1,94 @@
+"""ticket unique (chat_id, user_id)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Идемпотентная загрузка тикетов: колонка content_hash и уникальный
+ключ (chat_id, user_id) вместо обычного индекса. Накопившиеся
+дубликаты удаляются, остаётся самый свежий тикет пары.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+DELETE_DUPLICATES = """
+DELETE FROM ticket
+WHERE id IN (
+    SELECT id FROM (
+        SELECT
+            id,
+            row_number() OVER (
+                PARTITION BY chat_id, user_id
+                ORDER BY time_open DESC NULLS LAST, id DESC
+            ) AS rn
+        FROM ticket
+        WHERE user_id IS NOT NULL
+    ) ranked
+    WHERE rn > 1
+)
+"""
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("ticket"):
+        return
+
+    # Колонку и ограничение могло уже создать приложение при старте
+    columns = {column["name"] for column in inspector.get_columns("ticket")}
+    if "content_hash" not in columns:
+        op.add_column("ticket", sa.Column("content_hash", sa.String(64), nullable=True))
+    constraints = {
+        constraint["name"] for constraint in inspector.get_unique_constraints("ticket")
+    }
+    if "uq_ticket_chat_id_user_id" in constraints:
+        with op.get_context().autocommit_block():
+            op.drop_index(
+                "ix_ticket_chat_id_user_id", table_name="ticket",
+                if_exists=True, postgresql_concurrently=True,
+            )
+        return
+
+    op.execute(DELETE_DUPLICATES)
+
+    # autocommit_block сначала фиксирует удаление дубликатов,
+    # затем уникальный индекс строится без блокировки вставок
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_ticket_chat_id_user_id", "ticket", ["chat_id", "user_id"],
+            unique=True, if_not_exists=True, postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_ticket_chat_id_user_id", table_name="ticket",
+            if_exists=True, postgresql_concurrently=True,
+        )
+    op.execute(
+        "ALTER TABLE ticket ADD CONSTRAINT uq_ticket_chat_id_user_id "
+        "UNIQUE USING INDEX uq_ticket_chat_id_user_id"
+    )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("ticket"):
+        return
+
+    constraints = {
+        constraint["name"] for constraint in inspector.get_unique_constraints("ticket")
+    }
+    if "uq_ticket_chat_id_user_id" in constraints:
+        op.drop_constraint("uq_ticket_chat_id_user_id", "ticket", type_="unique")
+    op.create_index(
+        "ix_ticket_chat_id_user_id", "ticket", ["chat_id", "user_id"],
+        if_not_exists=True,
+    )
+    columns = {column["name"] for column in inspector.get_columns("ticket")}
+    if "content_hash" in columns:
+        op.drop_column("ticket", "content_hash")
@@ -0,0 +1,43 @@
+"""chat sync state
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Таблица chat_sync_state: загруженный диалог, отметки последнего
+и самого раннего загруженного сообщения для инкрементальной
+синхронизации чатов Bitrix24.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Таблицу могло уже создать приложение при старте
+    if sa.inspect(op.get_bind()).has_table("chat_sync_state"):
+        return
+
+    op.create_table(
+        "chat_sync_state",
+        sa.Column("chat_id", sa.String(20), primary_key=True),
+        sa.Column("ticket_id", sa.String(50), nullable=True),
+        sa.Column("last_message_id", sa.BigInteger(), nullable=False),
+        sa.Column("first_message_id", sa.BigInteger(), nullable=False),
+        sa.Column("history_complete", sa.Boolean(), nullable=False),
+        sa.Column("first_message_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_message_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("operator_ids", sa.JSON(), nullable=False),
+        sa.Column("dialogue", sa.JSON(), nullable=False),
+        sa.Column("is_resolved", sa.Boolean(), nullable=False),
+        sa.Column("synced_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("chat_sync_state", if_exists=True)
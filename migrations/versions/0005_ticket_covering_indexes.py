@@ -0,0 +1,98 @@
+"""ticket covering indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Индексы ticket под keyset-страницы и сверку хэшей без чтения таблицы:
+id добавлен в конец индексов по user_id и status (порядок страницы
+(time_open, id) без сортировки), уникальный ключ (chat_id, user_id)
+получает INCLUDE (content_hash) для index-only scan в ingest_chat.
+Индексы строятся CONCURRENTLY, ограничение переключается на новый
+индекс без повторной проверки уникальности.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+# Старое имя -> (новое имя, колонки)
+TICKET_INDEXES = {
+    "ix_ticket_user_id_time_open": (
+        "ix_ticket_user_id_time_open_id", ["user_id", "time_open", "id"]
+    ),
+    "ix_ticket_status_time_open": (
+        "ix_ticket_status_time_open_id", ["status", "time_open", "id"]
+    ),
+}
+UNIQUE_NAME = "uq_ticket_chat_id_user_id"
+SWAP_INDEX = "uq_ticket_chat_id_user_id_swap"
+
+# Есть ли у индекса ограничения неключевые (INCLUDE) колонки;
+# NULL, если ограничения нет
+UNIQUE_IS_COVERING = f"""
+SELECT i.indnatts > i.indnkeyatts
+FROM pg_index i
+WHERE i.indexrelid = to_regclass('{UNIQUE_NAME}')
+"""
+
+
+def _swap_unique(include: list) -> None:
+    """Переключает ограничение на индекс (chat_id, user_id) INCLUDE (...)."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            SWAP_INDEX, "ticket", ["chat_id", "user_id"], unique=True,
+            postgresql_include=include,
+            if_not_exists=True, postgresql_concurrently=True,
+        )
+    # USING INDEX переименовывает индекс в имя ограничения
+    op.execute(
+        f"ALTER TABLE ticket DROP CONSTRAINT IF EXISTS {UNIQUE_NAME}, "
+        f"ADD CONSTRAINT {UNIQUE_NAME} UNIQUE USING INDEX {SWAP_INDEX}"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("ticket"):
+        return
+
+    with op.get_context().autocommit_block():
+        for old_name, (name, columns) in TICKET_INDEXES.items():
+            op.create_index(
+                name, "ticket", columns,
+                if_not_exists=True, postgresql_concurrently=True,
+            )
+            op.drop_index(
+                old_name, table_name="ticket",
+                if_exists=True, postgresql_concurrently=True,
+            )
+
+    # Ограничение уже с INCLUDE, если таблицу создало приложение
+    if not bind.execute(sa.text(UNIQUE_IS_COVERING)).scalar():
+        _swap_unique(["content_hash"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("ticket"):
+        return
+
+    with op.get_context().autocommit_block():
+        for old_name, (name, columns) in TICKET_INDEXES.items():
+            op.create_index(
+                old_name, "ticket", columns[:2],
+                if_not_exists=True, postgresql_concurrently=True,
+            )
+            op.drop_index(
+                name, table_name="ticket",
+                if_exists=True, postgresql_concurrently=True,
+            )
+
+    if bind.execute(sa.text(UNIQUE_IS_COVERING)).scalar():
+        _swap_unique([])
@@ -0,0 +1,145 @@
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from src.bitrix.client import BITRIX_WEBHOOK_TOKENS, BitrixClient, bitrix_client
+from src.utils.concurrency import gather_bounded
+
+# Bitrix24 выполняет не больше 50 команд за один вызов batch
+BITRIX_BATCH_LIMIT = 50
+# Сколько пачек отправляется одновременно
+BITRIX_BATCH_CONCURRENCY = int(os.getenv("BITRIX_BATCH_CONCURRENCY", "2"))
+
+
+class BitrixCommandError(Exception):
+    """Ошибка отдельной команды внутри batch-вызова"""
+
+    def __init__(self, key: str, method: str, error: Any):
+        self.key = key
+        self.method = method
+        self.error = error
+        if isinstance(error, dict):
+            detail = error.get("error_description") or error.get("error")
+        else:
+            detail = error
+        super().__init__(f"Ошибка команды {method} ({key}): {detail}")
+
+
+def build_query(params: Dict[str, Any], prefix: Optional[str] = None) -> str:
+    """Кодирует параметры в строку запроса в формате PHP (FILTER[ID]=1).
+
+    Именно так Bitrix24 разбирает параметры команд внутри batch.
+    """
+    parts = []
+    for key, value in params.items():
+        name = f"{prefix}[{key}]" if prefix else str(key)
+        if isinstance(value, dict):
+            parts.append(build_query(value, name))
+        elif isinstance(value, (list, tuple)):
+            parts.append(build_query(dict(enumerate(value)), name))
+        else:
+            if isinstance(value, bool):
+                value = "Y" if value else "N"
+            parts.append(f"{quote(name, safe='[]')}={quote(str(value), safe='')}")
+    return "&".join(part for part in parts if part)
+
+
+class BatchResult:
+    """Результаты batch-вызова, разобранные по ключам команд"""
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BitrixCommandError] = {}
+
+    def get(self, key: str) -> Any:
+        """Результат команды; ошибка команды выбрасывается как исключение."""
+        if key in self.errors:
+            raise self.errors[key]
+        return self.results[key]
+
+
+class BitrixBatch:
+    """Накопитель команд для метода batch Bitrix24.
+
+    Команды группируются по токену вебхука (у каждого токена свои права),
+    режутся на пачки по 50 и отправляются одним HTTP-запросом на пачку.
+    Результаты и ошибки раскладываются обратно по ключам команд.
+    """
+
+    def __init__(self, client: BitrixClient = bitrix_client):
+        self.client = client
+        self._commands: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def add(
+        self,
+        key: str,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Добавляет команду в пачку и возвращает её ключ."""
+        if key in self._commands:
+            raise ValueError(f"Команда с ключом {key} уже добавлена")
+        self._commands[key] = (method, params or {})
+        return key
+
+    def _chunks(self) -> List[Tuple[str, List[str]]]:
+        by_token: Dict[str, List[str]] = defaultdict(list)
+        for key, (method, _) in self._commands.items():
+            by_token[BITRIX_WEBHOOK_TOKENS[method]].append(key)
+        return [
+            (token, keys[i:i + BITRIX_BATCH_LIMIT])
+            for token, keys in by_token.items()
+            for i in range(0, len(keys), BITRIX_BATCH_LIMIT)
+        ]
+
+    async def _execute_chunk(
+        self,
+        token: str,
+        keys: List[str],
+        result: BatchResult,
+    ) -> None:
+        cmd = {}
+        for key in keys:
+            method, params = self._commands[key]
+            query = build_query(params)
+            cmd[key] = f"{method}?{query}" if query else method
+
+        data = await self.client.call(
+            "batch", "POST", json={"halt": 0, "cmd": cmd}, token=token
+        )
+        payload = data.get("result") or {}
+        # Пустые коллекции и массивы с ключами 0..n-1 PHP отдаёт
+        # списком, а не объектом; ключи команд - строки
+        results = payload.get("result") or {}
+        errors = payload.get("result_error") or {}
+        if isinstance(results, list):
+            results = {str(i): value for i, value in enumerate(results)}
+        if isinstance(errors, list):
+            errors = {str(i): value for i, value in enumerate(errors)}
+
+        for key in keys:
+            method = self._commands[key][0]
+            if key in errors:
+                result.errors[key] = BitrixCommandError(key, method, errors[key])
+            elif key in results:
+                result.results[key] = results[key]
+            else:
+                result.errors[key] = BitrixCommandError(
+                    key, method, "нет результата в ответе batch"
+                )
+
+    async def execute(self) -> BatchResult:
+        """Отправляет все накопленные команды и возвращает их результаты."""
+        result = BatchResult()
+        await gather_bounded(
+            *(
+                self._execute_chunk(token, keys, result)
+                for token, keys in self._chunks()
+            ),
+            limit=BITRIX_BATCH_CONCURRENCY,
+        )
+        return result
@@ -0,0 +1,104 @@
+import os
+import time
+from enum import IntEnum
+from typing import Dict
+
+from src.metrics.registry import REGISTRY
+
+# Сколько сбоев подряд размыкают предохранитель
+BITRIX_BREAKER_FAILURES = int(os.getenv("BITRIX_BREAKER_FAILURES", "5"))
+# Через сколько секунд после размыкания пропускается пробный вызов
+BITRIX_BREAKER_RESET_TIMEOUT = float(os.getenv("BITRIX_BREAKER_RESET_TIMEOUT", "30"))
+
+BITRIX_BREAKER_REJECTIONS = REGISTRY.counter(
+    "bitrix_circuit_rejections_total",
+    "Вызовы Bitrix24, отклонённые разомкнутым предохранителем",
+    ["family"],
+)
+
+
+class BreakerState(IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """Предохранитель для группы методов внешнего сервиса.
+
+    После failure_threshold сбоев подряд размыкается, и вызовы
+    сразу отклоняются, не дожидаясь таймаутов. Через reset_timeout
+    секунд пропускается один пробный вызов: успех замыкает
+    предохранитель, сбой снова размыкает его.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BITRIX_BREAKER_FAILURES,
+        reset_timeout: float = BITRIX_BREAKER_RESET_TIMEOUT,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Можно ли выполнить вызов сейчас."""
+        if self.state == BreakerState.CLOSED:
+            return True
+        if self.state == BreakerState.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                BITRIX_BREAKER_REJECTIONS.labels(self.name).inc()
+                return False
+            self.state = BreakerState.HALF_OPEN
+        # Полуоткрытое состояние: одновременно идёт только один пробный вызов
+        if self._probing:
+            BITRIX_BREAKER_REJECTIONS.labels(self.name).inc()
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if (
+            self.state == BreakerState.HALF_OPEN
+            or self.failures >= self.failure_threshold
+        ):
+            self.state = BreakerState.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Вызов прерван без результата (например, отменён): проба не засчитывается."""
+        self._probing = False
+
+
+# Предохранители по семействам методов (user, im, imopenlines, batch)
+BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(method: str) -> CircuitBreaker:
+    family = method.split(".", 1)[0]
+    breaker = BREAKERS.get(family)
+    if breaker is None:
+        breaker = BREAKERS[family] = CircuitBreaker(family)
+    return breaker
+
+
+REGISTRY.gauge(
+    "bitrix_circuit_state",
+    "Состояние предохранителя: 0 - замкнут, 1 - пробный вызов, 2 - разомкнут",
+    ["family"],
+    callback=lambda: {
+        family: int(breaker.state) for family, breaker in BREAKERS.items()
+    },
+)
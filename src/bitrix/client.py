@@ -0,0 +1,337 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+from src.bitrix.breaker import breaker_for
+from src.bitrix.rate_limit import RateLimiter
+from src.metrics.registry import REGISTRY
+from src.utils.deadline import remaining
+
+load_dotenv()
+
+# Настройки подключения к Bitrix24
+BITRIX_WEBHOOK_URL = os.getenv(
+    "BITRIX_WEBHOOK_URL", "https://b24-ro4m0k.bitrix24.ru/rest/1"
+)
+BITRIX_POOL_LIMIT = int(os.getenv("BITRIX_POOL_LIMIT", "100"))
+BITRIX_POOL_LIMIT_PER_HOST = int(os.getenv("BITRIX_POOL_LIMIT_PER_HOST", "20"))
+BITRIX_KEEPALIVE_TIMEOUT = float(os.getenv("BITRIX_KEEPALIVE_TIMEOUT", "30"))
+BITRIX_DNS_CACHE_TTL = int(os.getenv("BITRIX_DNS_CACHE_TTL", "300"))
+BITRIX_CONNECT_TIMEOUT = float(os.getenv("BITRIX_CONNECT_TIMEOUT", "5"))
+BITRIX_TOTAL_TIMEOUT = float(os.getenv("BITRIX_TOTAL_TIMEOUT", "30"))
+# Время на один HTTP-обмен с Bitrix24 (без ожидания в ограничителе);
+# дополнительно ограничено дедлайном входящего запроса
+BITRIX_CALL_TIMEOUT = float(os.getenv("BITRIX_CALL_TIMEOUT", "10"))
+# Повторы при 503 и QUERY_LIMIT_EXCEEDED: число и экспоненциальная задержка
+BITRIX_MAX_RETRIES = int(os.getenv("BITRIX_MAX_RETRIES", "4"))
+BITRIX_RETRY_BASE_DELAY = float(os.getenv("BITRIX_RETRY_BASE_DELAY", "0.5"))
+BITRIX_RETRY_MAX_DELAY = float(os.getenv("BITRIX_RETRY_MAX_DELAY", "8"))
+
+# Токены входящих вебхуков: у каждого метода свой набор прав
+BITRIX_WEBHOOK_TOKENS = {
+    "user.get": "7c2l2pndd6rmc44g",
+    "im.recent.list": "fx3u6sfrdgcemvn0",
+    "im.dialog.messages.get": "vxokddeh6q71x9gi",
+    "imopenlines.dialog.get": "ixlly9svv3uw9my2",
+}
+
+
+BITRIX_REQUEST_SECONDS = REGISTRY.histogram(
+    "bitrix_request_duration_seconds",
+    "Время вызова метода Bitrix24 REST API",
+    ["method"],
+)
+BITRIX_RETRIES = REGISTRY.counter(
+    "bitrix_retries_total",
+    "Повторы вызовов Bitrix24 после 503 или превышения лимита",
+    ["method"],
+)
+BITRIX_ERRORS = REGISTRY.counter(
+    "bitrix_errors_total",
+    "Ошибки вызовов Bitrix24 по методу и причине (HTTP-статус или исключение)",
+    ["method", "reason"],
+)
+
+
+class BitrixError(Exception):
+    """Ошибка HTTP-ответа Bitrix24"""
+
+    def __init__(self, method: str, status: int, detail: str):
+        self.method = method
+        self.status = status
+        self.detail = detail
+        super().__init__(f"Ошибка запроса: {status} - {detail}")
+
+    @property
+    def retryable(self) -> bool:
+        """Перегрузка или превышение лимита запросов: имеет смысл повторить."""
+        return self.status == 503 or "QUERY_LIMIT_EXCEEDED" in self.detail
+
+    @property
+    def unavailable(self) -> bool:
+        """Сбой на стороне Bitrix24 или сети, а не ошибка в запросе."""
+        return self.status >= 500
+
+
+class DeadlineExceededError(BitrixError):
+    """Истёк дедлайн входящего запроса.
+
+    Время закончилось на нашей стороне (короткий X-Request-Timeout,
+    ожидание в ограничителе), поэтому это не сбой Bitrix24: ошибка
+    не повторяется и не засчитывается предохранителю.
+    """
+
+    def __init__(self, method: str, detail: str = "Истёк срок обработки запроса"):
+        super().__init__(method, 504, detail)
+
+    @property
+    def retryable(self) -> bool:
+        return False
+
+    @property
+    def unavailable(self) -> bool:
+        return False
+
+
+class CircuitOpenError(BitrixError):
+    """Вызов отклонён разомкнутым предохранителем"""
+
+    def __init__(self, method: str, family: str):
+        super().__init__(
+            method, 503, f"Bitrix24 недоступен (предохранитель {family} разомкнут)"
+        )
+
+
+class BitrixClient:
+    """HTTP-клиент Bitrix24 с общим пулом соединений.
+
+    Открывается и закрывается вместе с приложением (lifespan FastAPI),
+    поэтому keep-alive соединения и DNS-кэш переиспользуются
+    между запросами, а не создаются заново на каждый вызов.
+    """
+
+    def __init__(
+        self,
+        base_url: str = BITRIX_WEBHOOK_URL,
+        limit: int = BITRIX_POOL_LIMIT,
+        limit_per_host: int = BITRIX_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = BITRIX_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = BITRIX_DNS_CACHE_TTL,
+        connect_timeout: float = BITRIX_CONNECT_TIMEOUT,
+        total_timeout: float = BITRIX_TOTAL_TIMEOUT,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = BITRIX_MAX_RETRIES,
+        call_timeout: float = BITRIX_CALL_TIMEOUT,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout,
+            sock_connect=connect_timeout,
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Все вызовы проходят через один ограничитель: лимит общий на портал
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.call_timeout = call_timeout
+
+    async def start(self) -> None:
+        """Создаёт пул соединений (повторный вызов ничего не делает)."""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            headers={"Accept": "application/json"},
+        )
+
+    async def close(self) -> None:
+        """Закрывает пул соединений."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def url(self, method: str, token: Optional[str] = None) -> str:
+        """Полный адрес метода REST API с токеном вебхука."""
+        token = token or BITRIX_WEBHOOK_TOKENS[method]
+        return f"{self.base_url}/{token}/{method}.json"
+
+    async def call(
+        self,
+        method: str,
+        http_method: str = "GET",
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+        token: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Выполняет вызов метода Bitrix24 REST API.
+
+        Параметры:
+            method - имя метода REST API (например, user.get).
+            http_method - HTTP-метод запроса.
+            params - параметры строки запроса.
+            json - тело запроса.
+            token - токен вебхука, если он отличается от токена метода
+            (например, для batch).
+            timeout - время на HTTP-обмен (по умолчанию call_timeout);
+            фактически не больше, чем осталось до дедлайна запроса.
+        Возвращает:
+            Разобранный JSON-ответ. При статусе, отличном от 200,
+            выбрасывается BitrixError (504 - таймаут, 502 - сетевая ошибка).
+            Если раньше истёк дедлайн запроса - DeadlineExceededError.
+        Перед отправкой запрос ждёт своей очереди в ограничителе
+        (это ожидание ограничено только дедлайном запроса).
+        Ответы 503 и QUERY_LIMIT_EXCEEDED повторяются до max_retries раз
+        с экспоненциальной задержкой со случайной составляющей.
+        Пока предохранитель семейства методов разомкнут, вызов сразу
+        завершается CircuitOpenError. Предохранителю засчитываются
+        только сбои и таймауты самого HTTP-обмена.
+        """
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        breaker = breaker_for(method)
+        if not breaker.allow():
+            raise CircuitOpenError(method, breaker.name)
+        try:
+            result = await self._call_with_retries(
+                method, http_method, params, json, token,
+                self.call_timeout if timeout is None else timeout,
+            )
+        except DeadlineExceededError:
+            # Время вышло у нас, а не у Bitrix24: проба не засчитывается
+            breaker.release()
+            raise
+        except BitrixError as e:
+            if e.unavailable:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+    async def _call_with_retries(
+        self,
+        method: str,
+        http_method: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        token: Optional[str],
+        timeout: float,
+    ) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._request(
+                    method, http_method, params, json, token, timeout
+                )
+            except BitrixError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                delay = min(
+                    BITRIX_RETRY_MAX_DELAY, BITRIX_RETRY_BASE_DELAY * 2 ** attempt
+                )
+                delay = random.uniform(delay / 2, delay)
+                # Повтор не успеет до дедлайна запроса: отдаём ошибку сразу
+                deadline_left = remaining()
+                if deadline_left is not None and delay >= deadline_left:
+                    raise
+            BITRIX_RETRIES.labels(method).inc()
+            await asyncio.sleep(delay)
+
+    async def _request(
+        self,
+        method: str,
+        http_method: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        token: Optional[str],
+        timeout: float,
+    ) -> Dict[str, Any]:
+        # Очередь ограничителя - наша задержка: её ограничивает только дедлайн
+        try:
+            async with asyncio.timeout(remaining()):
+                await self.limiter.acquire()
+        except TimeoutError:
+            BITRIX_ERRORS.labels(method, "deadline").inc()
+            raise DeadlineExceededError(
+                method, "Истёк срок обработки запроса в очереди к Bitrix24"
+            ) from None
+
+        left = remaining(timeout)
+        if left <= 0:
+            BITRIX_ERRORS.labels(method, "deadline").inc()
+            raise DeadlineExceededError(method)
+        try:
+            async with asyncio.timeout(left):
+                return await self._send(method, http_method, params, json, token)
+        except TimeoutError:
+            if left < timeout:
+                # Обмен прервал дедлайн запроса, а не call_timeout
+                BITRIX_ERRORS.labels(method, "deadline").inc()
+                raise DeadlineExceededError(method) from None
+            BITRIX_ERRORS.labels(method, "timeout").inc()
+            raise BitrixError(
+                method, 504, f"Нет ответа за {timeout:.2f} с"
+            ) from None
+
+    async def _send(
+        self,
+        method: str,
+        http_method: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        token: Optional[str],
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            async with self._session.request(
+                http_method, self.url(method, token), params=params, json=json
+            ) as response:
+                if response.status != 200:
+                    raise BitrixError(method, response.status, await response.text())
+                return await response.json(content_type=None)
+        except BitrixError as e:
+            BITRIX_ERRORS.labels(method, e.status).inc()
+            raise
+        except aiohttp.ClientError as e:
+            BITRIX_ERRORS.labels(method, type(e).__name__).inc()
+            raise BitrixError(method, 502, str(e) or type(e).__name__) from e
+        except Exception as e:
+            BITRIX_ERRORS.labels(method, type(e).__name__).inc()
+            raise
+        finally:
+            BITRIX_REQUEST_SECONDS.labels(method).observe(time.perf_counter() - start)
+
+
+bitrix_client = BitrixClient()
+
+REGISTRY.gauge(
+    "bitrix_rate_limit_queued",
+    "Запросы к Bitrix24, ожидающие в очереди ограничителя",
+    ["priority"],
+    callback=lambda: {
+        name.removeprefix("queued_"): value
+        for name, value in bitrix_client.limiter.stats.items()
+        if name.startswith("queued_")
+    },
+)
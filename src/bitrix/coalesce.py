@@ -0,0 +1,218 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from src.bitrix.client import BitrixError, DeadlineExceededError
+from src.bitrix.rate_limit import background_priority
+from src.metrics.registry import REGISTRY
+from src.utils.cache import TTLCache
+from src.utils.deadline import remaining, request_deadline
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд результат чтения из Bitrix24 считается свежим
+BITRIX_COALESCE_TTL = float(os.getenv("BITRIX_COALESCE_TTL", "3"))
+# Сколько ещё секунд после этого отдаётся устаревший результат,
+# пока в фоне идёт обновление (stale-while-revalidate)
+BITRIX_COALESCE_STALE_TTL = float(os.getenv("BITRIX_COALESCE_STALE_TTL", "30"))
+# Сколько секунд после этого последний результат ещё хранится, чтобы
+# отдать его, если Bitrix24 недоступен (деградированный ответ)
+BITRIX_DEGRADED_TTL = float(os.getenv("BITRIX_DEGRADED_TTL", "600"))
+BITRIX_COALESCE_CACHE_SIZE = int(os.getenv("BITRIX_COALESCE_CACHE_SIZE", "1024"))
+
+# Все объединители по имени: для метрик
+COALESCERS: Dict[str, "Coalescer"] = {}
+
+
+class Coalescer:
+    """Объединение одинаковых чтений из внешнего сервиса (single-flight).
+
+    Одновременные вызовы с одним ключом ждут один общий запрос.
+    Результат хранится ttl секунд; ещё stale_ttl секунд после этого
+    он отдаётся сразу, а обновление запускается в фоне. Ошибки
+    не кэшируются. Если сервис недоступен (BitrixError.unavailable),
+    отдаётся последний результат, пока он не старше degraded_ttl
+    сверх этих сроков. Результат общий для всех вызывающих, поэтому
+    изменять его нельзя. Общий запрос не привязан к дедлайну того,
+    кто его начал: каждый ожидающий ждёт не дольше своего дедлайна.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = BITRIX_COALESCE_TTL,
+        stale_ttl: float = BITRIX_COALESCE_STALE_TTL,
+        degraded_ttl: float = BITRIX_DEGRADED_TTL,
+        maxsize: int = BITRIX_COALESCE_CACHE_SIZE,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # Запись живёт до конца окна деградации; моменты, до которых
+        # она свежая и допустимо устаревшая, хранятся рядом
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl + stale_ttl + degraded_ttl)
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.requests = 0
+        self.fetches = 0
+        self.joined = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.degraded = 0
+        self.errors = 0
+
+    def _start(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        async def run():
+            # Задача копирует контекст первого вызывающего; его дедлайн
+            # не должен ограничивать остальных ожидающих и фоновое обновление
+            request_deadline.set(None)
+            self.fetches += 1
+            try:
+                value = await fetch()
+            except Exception:
+                self.errors += 1
+                raise
+            now = time.monotonic()
+            self._cache.set(
+                key, (now + self.ttl, now + self.ttl + self.stale_ttl, value)
+            )
+            return value
+
+        def done(task: asyncio.Task) -> None:
+            self._inflight.pop(key, None)
+            # Ошибка считается полученной, даже если все ожидающие отменены
+            if not task.cancelled():
+                task.exception()
+
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        task.add_done_callback(done)
+        return task
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> None:
+        def log_error(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(
+                    "Фоновое обновление %s не удалось: %s", self.name, task.exception()
+                )
+
+        async def background_fetch():
+            # Обновление никто не ждёт: оно пропускает вперёд интерактивные запросы
+            with background_priority():
+                return await fetch()
+
+        self._start(key, background_fetch).add_done_callback(log_error)
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Результат fetch() для ключа: из кэша, общего запроса или нового."""
+        self.requests += 1
+        entry = self._cache.get(key)
+        if entry is not None:
+            fresh_until, stale_until, value = entry
+            now = time.monotonic()
+            if now < fresh_until:
+                self.hits += 1
+                return value
+            if now < stale_until:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._refresh(key, fetch)
+                return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(key, fetch)
+        else:
+            self.joined += 1
+        try:
+            # Отмена одного ожидающего не должна отменять общий запрос
+            async with asyncio.timeout(remaining()):
+                return await asyncio.shield(task)
+        except TimeoutError:
+            raise DeadlineExceededError(self.name) from None
+        except BitrixError as e:
+            if entry is None or not e.unavailable:
+                raise
+            logger.warning(
+                "%s: Bitrix24 недоступен, отдан последний результат: %s",
+                self.name, e,
+            )
+            self.degraded += 1
+            return entry[2]
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.invalidate(key)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Счётчики и доля запросов, обслуженных без обращения к сервису."""
+        return {
+            "requests": self.requests,
+            "fetches": self.fetches,
+            "joined": self.joined,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "degraded": self.degraded,
+            "errors": self.errors,
+            "coalesced_ratio": (
+                1 - self.fetches / self.requests if self.requests else 0.0
+            ),
+        }
+
+
+def coalesced(
+    ttl: float = BITRIX_COALESCE_TTL,
+    stale_ttl: float = BITRIX_COALESCE_STALE_TTL,
+):
+    """Декоратор классметода DAO: одинаковые вызовы объединяются через Coalescer.
+
+    Ключ - значения аргументов после привязки к сигнатуре
+    (с учётом значений по умолчанию), поэтому get(x) и get(x, limit=100)
+    считаются одним вызовом.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        coalescer = Coalescer(func.__qualname__, ttl=ttl, stale_ttl=stale_ttl)
+        COALESCERS[coalescer.name] = coalescer
+
+        @wraps(func)
+        async def wrapper(cls, *args, **kwargs):
+            bound = signature.bind(cls, *args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.values())[1:]
+            return await coalescer.get(key, lambda: func(cls, *args, **kwargs))
+
+        wrapper.coalescer = coalescer
+        return wrapper
+
+    return decorator
+
+
+REGISTRY.counter(
+    "bitrix_coalesce_events_total",
+    "Чтения из Bitrix24 через объединитель: запросы, реальные вызовы, "
+    "присоединения к общему запросу, свежие и устаревшие попадания, "
+    "деградированные ответы, ошибки",
+    ["name", "event"],
+    callback=lambda: {
+        (name, event): value
+        for name, coalescer in COALESCERS.items()
+        for event, value in coalescer.stats.items()
+        if event != "coalesced_ratio"
+    },
+)
+REGISTRY.gauge(
+    "bitrix_coalesced_ratio",
+    "Доля чтений из Bitrix24, обслуженных без отдельного вызова",
+    ["name"],
+    callback=lambda: {
+        name: coalescer.stats["coalesced_ratio"]
+        for name, coalescer in COALESCERS.items()
+    },
+)
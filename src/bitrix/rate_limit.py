@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Deque, Dict, Optional
+
+from src.metrics.registry import REGISTRY
+
+# Лимит входящих вебхуков Bitrix24: около 2 запросов в секунду
+BITRIX_RATE_LIMIT = float(os.getenv("BITRIX_RATE_LIMIT", "2"))
+# Сколько запросов можно отправить подряд после простоя
+BITRIX_RATE_BURST = int(os.getenv("BITRIX_RATE_BURST", "5"))
+
+BITRIX_RATE_WAIT_SECONDS = REGISTRY.histogram(
+    "bitrix_rate_limit_wait_seconds",
+    "Ожидание очереди ограничителя запросов к Bitrix24",
+    ["priority"],
+)
+
+
+class Priority(IntEnum):
+    """Приоритет запроса к Bitrix24: меньшее значение обслуживается раньше"""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# Приоритет запросов текущей задачи; по умолчанию - интерактивный
+bitrix_priority: ContextVar[Priority] = ContextVar(
+    "bitrix_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def background_priority():
+    """Запросы к Bitrix24 внутри блока пропускают вперёд интерактивные."""
+    token = bitrix_priority.set(Priority.BACKGROUND)
+    try:
+        yield
+    finally:
+        bitrix_priority.reset(token)
+
+
+class RateLimiter:
+    """Token bucket с очередями по приоритетам.
+
+    Запрос, которому не хватило токена, не отклоняется, а встаёт
+    в очередь своего приоритета. Очереди обслуживаются по порядку
+    (FIFO внутри приоритета), интерактивные - раньше фоновых.
+    """
+
+    def __init__(self, rate: float = BITRIX_RATE_LIMIT, burst: int = BITRIX_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._queues: Dict[Priority, Deque[asyncio.Future]] = {
+            priority: deque() for priority in Priority
+        }
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _waiting(self) -> bool:
+        return any(self._queues.values())
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue.popleft()
+                # Отменённые ожидающие просто выбрасываются из очереди
+                if not waiter.done():
+                    return waiter
+        return None
+
+    async def _dispatch(self) -> None:
+        while self._waiting():
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            waiter = self._next_waiter()
+            if waiter is not None:
+                self.tokens -= 1
+                waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        """Ждёт разрешения на один запрос."""
+        priority = bitrix_priority.get()
+        self._refill()
+        if self.tokens >= 1 and not self._waiting():
+            self.tokens -= 1
+            BITRIX_RATE_WAIT_SECONDS.labels(priority.name.lower()).observe(0.0)
+            return
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(waiter)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await waiter
+        BITRIX_RATE_WAIT_SECONDS.labels(priority.name.lower()).observe(
+            time.monotonic() - start
+        )
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "tokens": self.tokens,
+            **{
+                f"queued_{priority.name.lower()}": len(queue)
+                for priority, queue in self._queues.items()
+            },
+        }
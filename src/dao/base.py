@@ -1,25 +1,37 @@
+import json
 from typing import (
-    Any, Dict, Generic, List, Optional, Type, TypeVar, Union, Unpack
+    Any, AsyncIterable, AsyncIterator, Dict, Generic, Iterable, List, Optional,
+    Type, TypeVar, Union, Unpack
 )
 
 from pydantic import BaseModel
 
 from sqlalchemy import (
+    JSON,
+    PrimaryKeyConstraint,
     Select,
+    UniqueConstraint,
     and_,
+    any_,
+    bindparam,
     delete as sqlalchemy_delete,
     func,
     insert,
     literal,
     or_,
-    union_all,
+    text,
+    tuple_,
     update as sqlalchemy_update,
 )
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from src.dao.schemas import PagePaginate
+from src.dao.database import async_session_maker
+from src.dao.cursor import coerce_cursor_value, decode_cursor, encode_cursor
+from src.dao.db_error_handler import UniqueConflictError
+from src.dao.schemas import BulkResolve, PagePaginate, UpsertResult
 from src.dao.session_manager import SessionManager
 
 
@@ -32,6 +44,8 @@ class BaseDAO(Generic[ModelType]):
 
     model: Type[ModelType]
     options: List[Any] = []
+    # Размер пачки для массовых операций
+    chunk_size: int = 5000
 
     @classmethod
     def _get_entity_name(cls) -> str:
@@ -40,7 +54,34 @@ class BaseDAO(Generic[ModelType]):
         Используется для более понятного вывода имени таблицы
         при возникновении ошибок.
         """
-        return cls.model._tablename
+        return getattr(cls.model, "_tablename", cls.model.__tablename__)
+
+    @classmethod
+    def _chunks(cls, items: List[Any]) -> List[List[Any]]:
+        """Разбивает список на пачки по chunk_size."""
+        return [
+            items[i:i + cls.chunk_size]
+            for i in range(0, len(items), cls.chunk_size)
+        ]
+
+    @classmethod
+    def _any_of(cls, column: Any, values: Iterable[Any]) -> Any:
+        """Условие column = ANY(:values) с одним параметром-массивом.
+
+        В отличие от IN (...) не порождает по параметру на значение,
+        поэтому не упирается в лимит параметров драйвера и не раздувает
+        кэш подготовленных запросов.
+        """
+        return column == any_(
+            bindparam(None, list(values), type_=ARRAY(column.type))
+        )
+
+    @classmethod
+    def _filter_condition(cls, column: Any, value: Any) -> Any:
+        """Условие фильтрации: списки сравниваются через ANY, остальное - через =."""
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return cls._any_of(column, value)
+        return column == value
 
     @classmethod
     @SessionManager.with_session()
@@ -60,7 +101,10 @@ class BaseDAO(Generic[ModelType]):
         count_query = (
             select(func.count())
             .select_from(cls.model)
-            .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
+            .where(*[
+                cls._filter_condition(getattr(cls.model, k), v)
+                for k, v in filter_by.items()
+            ])
         )
 
         result = await session.execute(count_query)
@@ -86,6 +130,88 @@ class BaseDAO(Generic[ModelType]):
         result = await session.execute(query)
         return result.scalar_one()
 
+    @classmethod
+    @SessionManager.with_session()
+    async def resolve_many(
+        cls,
+        session: AsyncSession,
+        field: str,
+        values: List[Any],
+    ) -> BulkResolve:
+        """Находит записи по списку значений одного поля одним запросом.
+
+        В отличие от paginate не выполняет подсчёт количества записей.
+
+        Параметры:
+            session - асинхронная сессия SQLAlchemy.
+            field - имя поля модели (желательно индексированного).
+            values - список искомых значений.
+        Возвращает:
+            Объект BulkResolve: словарь {значение поля: запись}
+            и список значений, для которых записи не найдены.
+        """
+        keys = list(dict.fromkeys(values))
+        if not keys:
+            return BulkResolve(values={}, missing=[])
+
+        column = getattr(cls.model, field)
+        found = {}
+        for chunk in cls._chunks(keys):
+            query = (
+                select(cls.model)
+                .where(cls._any_of(column, chunk))
+                .options(*cls.options)
+            )
+            result = await session.execute(query)
+            found.update(
+                (getattr(obj, field), obj) for obj in result.scalars().all()
+            )
+
+        return BulkResolve(
+            values=found,
+            missing=[key for key in keys if key not in found]
+        )
+
+    @classmethod
+    async def stream_chunks(
+        cls,
+        chunk_size: int = 1000,
+        base_query: Optional[Select] = None,
+        **filter_by: Unpack[Dict[str, Any]],
+    ) -> AsyncIterator[List[ModelType]]:
+        """Построчное чтение выборки порциями через серверный курсор.
+
+        Открывает собственную сессию, так как потребляется уже после
+        выхода из обработчика (например, в StreamingResponse).
+        После каждой порции объекты отвязываются от сессии, поэтому
+        расход памяти не зависит от размера таблицы.
+
+        Параметры:
+            chunk_size - количество записей в порции.
+            base_query - базовый запрос для выборки
+            (если не указан, используется запрос по модели).
+            filter_by - условия фильтрации на равенство.
+        Возвращает:
+            Асинхронный итератор списков записей.
+        """
+        query = base_query if base_query is not None else select(cls.model)
+        query = (
+            query
+            .where(*[
+                cls._filter_condition(getattr(cls.model, k), v)
+                for k, v in filter_by.items()
+            ])
+            .options(*cls.options)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        async with async_session_maker() as session:
+            async with session.begin():
+                result = await session.stream_scalars(query)
+                async for chunk in result.partitions():
+                    yield chunk
+                    session.expunge_all()
+
     @classmethod
     @SessionManager.with_session(auto_commit=True)
     async def create(
@@ -119,35 +245,353 @@ class BaseDAO(Generic[ModelType]):
         session: AsyncSession,
         values_list: List[Dict[str, Any]],
         returning: bool = True
-    ) -> Optional[List[ModelType]]:
-        """Массовое создание записей.
+    ) -> List[Any]:
+        """Массовое создание записей многострочными INSERT
+        (пачками по chunk_size в одной транзакции).
 
         Параметры:
             session - асинхронная сессия SQLAlchemy.
             values_list - список словарей с данными для создания записей.
             returning - если True, возвращает список созданных объектов.
         Возвращает:
-            Список созданных объектов или количество созданных записей.
+            Список созданных объектов или список идентификаторов
+            созданных записей (returning=False). Для пустого списка
+            запрос не выполняется и возвращается пустой список.
         """
         if not values_list:
-            if returning:
-                return []
+            return []
 
         query = insert(cls.model)
 
+        if returning:
+            query = query.returning(
+                cls.model, sort_by_parameter_order=True
+            ).options(*cls.options)
+        else:
+            query = query.returning(cls.model.id, sort_by_parameter_order=True)
+
+        created = []
+        for chunk in cls._chunks(values_list):
+            result = await session.execute(query, chunk)
+            created.extend(result.scalars().all())
+        if len(created) != len(values_list):
+            raise NoResultFound
+        return created
+
+    @classmethod
+    def _unique_keys(cls) -> List[tuple]:
+        """Уникальные ключи таблицы: (имя ограничения в PostgreSQL, колонки)."""
+        table = cls.model.__table__
+        keys = []
+        for constraint in table.constraints:
+            columns = [column.name for column in constraint.columns]
+            if isinstance(constraint, PrimaryKeyConstraint):
+                name = constraint.name or f"{table.name}_pkey"
+            elif isinstance(constraint, UniqueConstraint):
+                name = constraint.name or f"{table.name}_{'_'.join(columns)}_key"
+            else:
+                continue
+            keys.append((name, columns))
+        for index in table.indexes:
+            if index.unique:
+                keys.append((index.name, [column.name for column in index.columns]))
+        return keys
+
+    @classmethod
+    async def _find_conflict(
+        cls,
+        session: AsyncSession,
+        values: Dict[str, Any],
+    ) -> Optional[str]:
+        """Определяет, с каким уникальным ключом конфликтуют значения."""
+        keys = [
+            (name, columns) for name, columns in cls._unique_keys()
+            if all(values.get(column) is not None for column in columns)
+        ]
+        if not keys:
+            return None
+
+        query = select(cls.model).where(or_(*[
+            and_(*[getattr(cls.model, column) == values[column] for column in columns])
+            for _, columns in keys
+        ])).limit(1)
+        existing = (await session.execute(query)).scalar_one_or_none()
+        if existing is None:
+            return None
+        for name, columns in keys:
+            if all(getattr(existing, column) == values[column] for column in columns):
+                return name
+        return None
+
+    @classmethod
+    @SessionManager.with_session(auto_commit=True)
+    async def insert_or_conflict(
+        cls,
+        session: AsyncSession,
+        values: Dict[str, Any],
+        conflict_target: Optional[List[str]] = None,
+        raise_on_conflict: bool = False,
+    ) -> UpsertResult:
+        """Атомарная вставка записи: INSERT ... ON CONFLICT DO NOTHING.
+
+        Параметры:
+            session - асинхронная сессия SQLAlchemy.
+            values - значения для создания записи.
+            conflict_target - колонки уникального ключа
+            (если не указаны, учитываются все ограничения уникальности).
+            raise_on_conflict - если True, при конфликте выбрасывается
+            UniqueConflictError (обработчик ошибок превращает его в 409).
+        Возвращает:
+            UpsertResult с созданной записью либо с именем ограничения,
+            с которым возник конфликт.
+        """
+        query = (
+            pg_insert(cls.model)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=conflict_target)
+            .returning(cls.model)
+            .options(*cls.options)
+        )
+        created = (await session.execute(query)).scalar_one_or_none()
+        if created is not None:
+            return UpsertResult(value=created, inserted=True)
+
+        # Запись не вставлена: выясняем, какое ограничение помешало
+        constraint = await cls._find_conflict(session=session, values=values)
+        if raise_on_conflict:
+            raise UniqueConflictError(cls._get_entity_name(), constraint)
+        return UpsertResult(inserted=False, conflict=constraint)
+
+    @classmethod
+    def _upsert_query(
+        cls,
+        values: Union[Dict[str, Any], List[Dict[str, Any]]],
+        conflict_target: List[str],
+        update_fields: Optional[List[str]],
+        only_if_changed: Optional[List[str]],
+    ) -> Any:
+        query = pg_insert(cls.model).values(values)
+        if update_fields is None:
+            sample = values[0] if isinstance(values, list) else values
+            update_fields = [
+                field for field in sample
+                if field not in conflict_target and field != "id"
+            ]
+        if not update_fields:
+            return query.on_conflict_do_nothing(index_elements=conflict_target)
+
+        where = None
+        if only_if_changed:
+            # Строка перезаписывается, только если значения действительно изменились
+            where = or_(*[
+                getattr(cls.model, field).is_distinct_from(query.excluded[field])
+                for field in only_if_changed
+            ])
+        return query.on_conflict_do_update(
+            index_elements=conflict_target,
+            set_={field: query.excluded[field] for field in update_fields},
+            where=where,
+        )
+
+    @classmethod
+    @SessionManager.with_session(auto_commit=True)
+    async def upsert(
+        cls,
+        session: AsyncSession,
+        values: Dict[str, Any],
+        conflict_target: List[str],
+        update_fields: Optional[List[str]] = None,
+        only_if_changed: Optional[List[str]] = None,
+        returning: bool = True,
+    ) -> UpsertResult:
+        """Вставка или обновление записи: INSERT ... ON CONFLICT DO UPDATE.
+
+        Параметры:
+            session - асинхронная сессия SQLAlchemy.
+            values - значения записи.
+            conflict_target - колонки уникального ключа.
+            update_fields - поля, обновляемые при конфликте
+            (по умолчанию все переданные, кроме ключа и id).
+            only_if_changed - поля, при неизменности которых
+            существующая строка не перезаписывается.
+            returning - если True, возвращает записанный объект.
+        Возвращает:
+            UpsertResult с записанным объектом (None, если строка
+            не изменилась или returning=False).
+        """
+        query = cls._upsert_query(
+            values, conflict_target, update_fields, only_if_changed
+        )
+        if returning:
+            query = query.returning(cls.model).options(*cls.options)
+            written = (await session.execute(query)).scalar_one_or_none()
+            return UpsertResult(value=written, inserted=written is not None)
+
+        result = await session.execute(query)
+        return UpsertResult(inserted=result.rowcount > 0)
+
+    @classmethod
+    @SessionManager.with_session(auto_commit=True)
+    async def upsert_many(
+        cls,
+        session: AsyncSession,
+        values_list: List[Dict[str, Any]],
+        conflict_target: List[str],
+        update_fields: Optional[List[str]] = None,
+        only_if_changed: Optional[List[str]] = None,
+        returning: bool = True,
+    ) -> List[Any]:
+        """Массовая вставка или обновление записей одним запросом.
+
+        Параметры аналогичны upsert; все словари должны иметь
+        одинаковый набор ключей.
+        Возвращает:
+            Список записанных объектов (или их идентификаторов при
+            returning=False). Строки, пропущенные из-за only_if_changed,
+            в список не попадают.
+        """
+        if not values_list:
+            return []
+
+        query = cls._upsert_query(
+            values_list, conflict_target, update_fields, only_if_changed
+        )
         if returning:
             query = query.returning(cls.model).options(*cls.options)
         else:
             query = query.returning(cls.model.id)
 
-        result = await session.execute(query, values_list)
-        if returning:
-            created_objs = result.scalars().all()
-            if len(created_objs) != len(values_list):
-                raise NoResultFound
-            return created_objs
-        if len(result.scalars().all()) != len(values_list):
-            raise NoResultFound
+        result = await session.execute(query)
+        return result.scalars().all()
+
+    @classmethod
+    def _copy_row(cls, record: Dict[str, Any], columns: List[Any]) -> tuple:
+        """Готовит запись к COPY: подставляет python-умолчания колонок
+        (COPY их не вычисляет) и сериализует JSON-поля.
+        """
+        row = []
+        for column in columns:
+            if column.name in record:
+                value = record[column.name]
+            elif column.default is not None and column.default.is_scalar:
+                value = column.default.arg
+            elif column.default is not None and column.default.is_callable:
+                value = column.default.arg(None)
+            else:
+                value = None
+            if value is not None and isinstance(column.type, JSON):
+                value = json.dumps(value, ensure_ascii=False)
+            row.append(value)
+        return tuple(row)
+
+    @classmethod
+    @SessionManager.with_session(auto_commit=True)
+    async def copy_in(
+        cls,
+        session: AsyncSession,
+        records: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        columns: Optional[List[str]] = None,
+        conflict_target: Optional[List[str]] = None,
+        update_fields: Optional[List[str]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        """Быстрая массовая загрузка через COPY (asyncpg copy_records_to_table).
+
+        Записи читаются и отправляются пачками, поэтому источник может
+        быть асинхронным итератором произвольной длины.
+        Если указан conflict_target, данные сначала копируются во
+        временную таблицу, а затем переносятся
+        INSERT ... SELECT ... ON CONFLICT, что делает повторную
+        загрузку тех же данных идемпотентной. Если ключ повторяется
+        внутри одной загрузки, переносится последняя из таких записей
+        (строки с NULL в ключе не конфликтуют и переносятся все).
+
+        Параметры:
+            session - асинхронная сессия SQLAlchemy.
+            records - итератор (или асинхронный итератор) словарей.
+            columns - загружаемые колонки (по умолчанию все колонки таблицы).
+            conflict_target - колонки уникального ключа для ON CONFLICT.
+            update_fields - поля, обновляемые при конфликте
+            (если не указаны, конфликтующие строки пропускаются).
+            chunk_size - размер пачки (по умолчанию chunk_size класса).
+        Возвращает:
+            Количество вставленных (или обновлённых) строк.
+        """
+        table = cls.model.__table__
+        table_columns = (
+            [table.c[name] for name in columns] if columns
+            else list(table.columns)
+        )
+        column_names = [column.name for column in table_columns]
+        chunk_size = chunk_size or cls.chunk_size
+
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        target = table.name
+        if conflict_target is not None:
+            target = f"{table.name}_copy_staging"
+            # _copy_seq нумерует строки в порядке загрузки: по нему
+            # из повторов ключа выбирается последняя запись
+            await session.execute(text(
+                f'CREATE TEMP TABLE IF NOT EXISTS "{target}" '
+                f'(LIKE "{table.name}" INCLUDING DEFAULTS, '
+                f'"_copy_seq" bigserial) ON COMMIT DROP'
+            ))
+            await session.execute(text(f'TRUNCATE "{target}"'))
+
+        copied = 0
+
+        async def flush(rows: List[tuple]) -> None:
+            nonlocal copied
+            await driver_connection.copy_records_to_table(
+                target, records=rows, columns=column_names
+            )
+            copied += len(rows)
+
+        rows = []
+        if isinstance(records, AsyncIterable):
+            async for record in records:
+                rows.append(cls._copy_row(record, table_columns))
+                if len(rows) >= chunk_size:
+                    await flush(rows)
+                    rows = []
+        else:
+            for record in records:
+                rows.append(cls._copy_row(record, table_columns))
+                if len(rows) >= chunk_size:
+                    await flush(rows)
+                    rows = []
+        if rows:
+            await flush(rows)
+
+        if conflict_target is None:
+            return copied
+
+        # Переносим данные из временной таблицы с разрешением конфликтов.
+        # ON CONFLICT DO UPDATE не может изменить строку дважды за один
+        # запрос, поэтому повторы ключа внутри загрузки схлопываются заранее
+        quoted = ", ".join(f'"{name}"' for name in column_names)
+        conflict = ", ".join(f'"{name}"' for name in conflict_target)
+        keyed = " AND ".join(f'"{name}" IS NOT NULL' for name in conflict_target)
+        staged = (
+            f'(SELECT DISTINCT ON ({conflict}) {quoted} FROM "{target}" '
+            f'WHERE {keyed} ORDER BY {conflict}, "_copy_seq" DESC) '
+            f'UNION ALL (SELECT {quoted} FROM "{target}" WHERE NOT ({keyed}))'
+        )
+        if update_fields:
+            action = "DO UPDATE SET " + ", ".join(
+                f'"{name}" = EXCLUDED."{name}"' for name in update_fields
+            )
+        else:
+            action = "DO NOTHING"
+        result = await session.execute(text(
+            f'INSERT INTO "{table.name}" ({quoted}) '
+            f'SELECT {quoted} FROM ({staged}) AS staged '
+            f'ON CONFLICT ({conflict}) {action}'
+        ))
+        return result.rowcount
 
     @classmethod
     @SessionManager.with_session(auto_commit=True)
@@ -189,6 +633,48 @@ class BaseDAO(Generic[ModelType]):
 
         result.scalar_one()
 
+    @classmethod
+    async def _update_chunk(
+        cls,
+        session: AsyncSession,
+        values_list: List[Dict[str, Any]],
+        update_columns: List[str],
+        returning: bool,
+    ) -> List[Any]:
+        """UPDATE ... FROM unnest(:id[], :col1[], ...) для одной пачки.
+
+        Каждая колонка передаётся одним типизированным массивом,
+        поэтому число параметров равно числу колонок, а не ячеек.
+        """
+        table = cls.model.__table__
+        columns = ["id"] + update_columns
+        arrays = [
+            bindparam(
+                f"{column}_values",
+                [item.get(column) for item in values_list],
+                type_=ARRAY(table.c[column].type),
+            )
+            for column in columns
+        ]
+        values = (
+            func.unnest(*arrays)
+            .table_valued(*columns)
+            .render_derived(name="v")
+        )
+
+        query = (
+            sqlalchemy_update(cls.model)
+            .where(cls.model.id == values.c.id)
+            .values({column: values.c[column] for column in update_columns})
+        )
+        if returning:
+            query = query.returning(cls.model).options(*cls.options)
+        else:
+            query = query.returning(cls.model.id)
+
+        result = await session.execute(query)
+        return result.scalars().all()
+
     @classmethod
     @SessionManager.with_session(auto_commit=True)
     async def update_many(
@@ -200,12 +686,20 @@ class BaseDAO(Generic[ModelType]):
         """
         Массовое обновление записей с сохранением исходного порядка.
 
-        Если returning=True, обновление происходит батчами
-        (например, по 1000 записей),
-        для каждого батча сразу производится SELECT обновлённых записей
-        с сортировкой по порядковому номеру,
-        определяемому исходным списком.
-        Итоговый список – конкатенация результатов батчей.
+        Значения каждой колонки передаются типизированным массивом
+        и разворачиваются через unnest, поэтому размер запроса
+        и число параметров не растут с количеством записей.
+        Записи обрабатываются пачками по chunk_size в одной транзакции.
+        Колонки, отсутствующие в части словарей, для них обнуляются.
+
+        Параметры:
+            session - асинхронная сессия SQLAlchemy.
+            values_list - список словарей с id и новыми значениями полей.
+            returning - если True, возвращает обновлённые объекты
+            в порядке values_list.
+        Возвращает:
+            Список обновлённых объектов. Если обновлены не все записи,
+            выбрасывается исключение.
         """
         if not values_list:
             if returning:
@@ -215,76 +709,34 @@ class BaseDAO(Generic[ModelType]):
 
         for value in values_list:
             if not value.get('id'):
-                raise
-
-        # Получаем все уникальные колонки для обновления из всех записей
-        update_columns = set().union(
-            *[item.keys() for item in values_list]
-        ) - {'id'}
-
-        # Формируем CTE для всех значений сразу
-        values_query = (
-            union_all(*[
-                select(*[
-                    literal(
-                        item.get(col),
-                        type_=cls.model.__table__.columns[col].type
-                    ).label(col)
-                    for col in ['id'] + list(update_columns)
-                ])
-                for item in values_list
-            ])
-            .cte('v')
-        )
+                raise ValueError("Для массового обновления у каждой записи должен быть id")
 
-        # Выполняем обновление всех записей одним запросом
-        update_query = (
-            sqlalchemy_update(cls.model)
-            .where(cls.model.id == values_query.c.id)
-            .values({
-                col: getattr(values_query.c, col)
-                for col in update_columns
-            })
-        )
+        # Получаем все колонки для обновления из всех записей
+        update_columns = list(dict.fromkeys(
+            key for item in values_list for key in item if key != 'id'
+        ))
 
-        if returning:
-            update_query = (
-                update_query
-                .returning(cls.model)
-                .options(*cls.options)
-            )
-        else:
-            update_query = update_query.returning(cls.model.id)
+        updated_objects = []
+        for chunk in cls._chunks(values_list):
+            updated_objects.extend(await cls._update_chunk(
+                session=session,
+                values_list=chunk,
+                update_columns=update_columns,
+                returning=returning
+            ))
 
-        result = await session.execute(update_query)
+        # Проверяем, что все записи были обновлены
+        if len(updated_objects) != len(values_list):
+            raise NoResultFound
 
         if returning:
-
-            updated_objects = result.scalars().all()
-
-            # Проверяем, что все записи были обновлены
-            if len(updated_objects) != len(values_list):
-                raise NoResultFound
-
-            ids = [item["id"] for item in values_list]
-
-            updated_dict = {obj.id: obj for obj in updated_objects}
-
-            updated_objects = []
-            for id_ in ids:
-                obj = updated_dict.get(id_)
-                if obj:
-                    updated_objects.append(obj)
-
-            id_positions = {id_val: index for index, id_val in enumerate(ids)}
-
-            updated_objects = sorted(updated_objects,
-                                     key=lambda obj: id_positions.get(obj.id))
-
-            return updated_objects
-
-        if len(result.scalars().all()) != len(values_list):
-                raise NoResultFound
+            id_positions = {
+                str(item["id"]): index for index, item in enumerate(values_list)
+            }
+            return sorted(
+                updated_objects,
+                key=lambda obj: id_positions.get(str(obj.id))
+            )
 
     @classmethod
     @SessionManager.with_session(auto_commit=True)
@@ -324,7 +776,8 @@ class BaseDAO(Generic[ModelType]):
         ids: List[Union[int, str]],
         returning: bool = True,
     ) -> Optional[List[ModelType]]:
-        """Массовое удаление записей.
+        """Массовое удаление записей (id передаются массивом в = ANY(...),
+        пачками по chunk_size в одной транзакции).
 
         Параметры:
             session - асинхронная сессия SQLAlchemy.
@@ -336,21 +789,26 @@ class BaseDAO(Generic[ModelType]):
             выбрасывается исключение.
         """
         if not ids:
+            return [] if returning else None
+
+        deleted = []
+        for chunk in cls._chunks(ids):
+            query = sqlalchemy_delete(cls.model).where(
+                cls._any_of(cls.model.id, chunk)
+            )
             if returning:
-                return []
-        query = sqlalchemy_delete(cls.model).where(cls.model.id.in_(ids))
-        if returning:
-            query = query.returning(cls.model).options(*cls.options)
-        else:
-            query = query.returning(cls.model.id)
-        result = await session.execute(query)
-        if returning:
-            deleted_objs = result.scalars().all()
-            if len(deleted_objs) != len(ids):
-                raise NoResultFound
-            return deleted_objs
-        if len(result.scalars().all()) != len(ids):
+                query = query.returning(cls.model).options(*cls.options)
+            else:
+                query = query.returning(cls.model.id)
+            result = await session.execute(query)
+            deleted.extend(result.scalars().all())
+
+        if len(deleted) != len(ids):
             raise NoResultFound
+        if returning:
+            # Возвращаем объекты в порядке переданных идентификаторов
+            positions = {str(id_): index for index, id_ in enumerate(ids)}
+            return sorted(deleted, key=lambda obj: positions.get(str(obj.id)))
 
     @classmethod
     @SessionManager.with_session(auto_commit=False)
@@ -363,6 +821,11 @@ class BaseDAO(Generic[ModelType]):
         base_query: Optional[Select] = None,
         search_fields: Optional[List[str]] = None,
         include_nullable: Optional[bool] = True,
+        cursor: Optional[str] = None,
+        keyset: bool = False,
+        sort_by: str = "id",
+        with_total: Optional[bool] = None,
+        estimate_total: bool = False,
         **filters: Unpack[Dict[str, Any]]
     ) -> PagePaginate:
         """Пагинация (разбиение на страницы) выборки записей.
@@ -377,11 +840,24 @@ class BaseDAO(Generic[ModelType]):
             (если не указан, используется запрос по модели).
             search_fields - список полей модели,
             по которым будет применяться поиск.
-            filters - дополнительные условия фильтрации.
+            cursor - курсор из next_cursor/prev_cursor предыдущей страницы
+            (включает keyset-режим).
+            keyset - keyset-пагинация по (sort_by, id) вместо OFFSET/LIMIT;
+            первая страница запрашивается без курсора.
+            sort_by - поле сортировки для keyset-режима
+            (должно быть NOT NULL, id добавляется для стабильности порядка).
+            with_total - выполнять ли COUNT(*) по выборке (по умолчанию
+            выполняется только в режиме OFFSET/LIMIT).
+            estimate_total - вместо COUNT(*) взять оценку числа строк
+            таблицы из pg_class.reltuples (фильтры не учитываются).
+            filters - дополнительные условия фильтрации
+            (для списка значений используется = ANY(...)).
         Возвращает:
             Объект PagePaginate, содержащий список записей,
             общее количество записей,
             номер текущей страницы, общее количество страниц и размер страницы.
+            В keyset-режиме вместо номера страницы заполняются
+            next_cursor/prev_cursor.
         """
         query = base_query if base_query is not None else select(cls.model)
 
@@ -410,17 +886,41 @@ class BaseDAO(Generic[ModelType]):
                 if value is None and include_nullable:
                     filter_conditions.append(field.is_(None))
                 elif value is not None:
-                    filter_conditions.append(field == value)
+                    filter_conditions.append(
+                        cls._filter_condition(field, value)
+                    )
         if filter_conditions:
             query = query.where(and_(*filter_conditions))
 
+        keyset = keyset or cursor is not None
+        if with_total is None:
+            with_total = not keyset
+
         # Получаем общее количество записей для пагинации
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await session.scalar(count_query)
+        total = None
+        if estimate_total:
+            total = await cls._estimate_total(session=session)
+        elif with_total:
+            count_query = select(func.count()).select_from(query.subquery())
+            total = await session.scalar(count_query)
+
+        if keyset:
+            return await cls._paginate_keyset(
+                session=session,
+                query=query,
+                page_size=page_size,
+                cursor=cursor,
+                sort_by=sort_by,
+                total=total
+            )
 
         if page_size == -1:
             total_pages = 1
             page = 1
+        elif total is None:
+            total_pages = None
+            page = max(1, page)
+            query = query.offset((page - 1) * page_size).limit(page_size)
         else:
             total_pages = (total + page_size - 1) // page_size
             page = min(max(1, page), total_pages) if total_pages > 0 else 1
@@ -436,3 +936,100 @@ class BaseDAO(Generic[ModelType]):
             pages=total_pages,
             page_size=page_size
         )
+
+    @classmethod
+    async def _paginate_keyset(
+        cls,
+        session: AsyncSession,
+        query: Select,
+        page_size: int,
+        cursor: Optional[str],
+        sort_by: str,
+        total: Optional[int],
+    ) -> PagePaginate:
+        """Страница keyset-пагинации: WHERE (k, id) > (...) ORDER BY k, id.
+
+        Вместо OFFSET используется поиск по индексу от последней
+        записи предыдущей страницы, поэтому стоимость не зависит
+        от глубины страницы.
+        """
+        id_column = cls.model.id
+        sort_column = getattr(cls.model, sort_by)
+        columns = [id_column] if sort_by == "id" else [sort_column, id_column]
+
+        direction = "next"
+        if cursor is not None:
+            position = decode_cursor(cursor)
+            direction = position["d"]
+            values = [coerce_cursor_value(id_column, position.get("id"))]
+            if sort_by != "id":
+                values.insert(0, coerce_cursor_value(sort_column, position.get("k")))
+            bound = tuple_(*[
+                literal(value, type_=column.type)
+                for value, column in zip(values, columns)
+            ])
+            if direction == "next":
+                query = query.where(tuple_(*columns) > bound)
+            else:
+                query = query.where(tuple_(*columns) < bound)
+
+        if direction == "next":
+            query = query.order_by(*columns)
+        else:
+            query = query.order_by(*[column.desc() for column in columns])
+        if page_size != -1:
+            query = query.limit(page_size + 1)
+
+        result = await session.execute(query)
+        items = list(result.scalars().all())
+
+        has_more = page_size != -1 and len(items) > page_size
+        if has_more:
+            items = items[:page_size]
+        if direction == "prev":
+            items.reverse()
+
+        def make_cursor(obj: Any, cursor_direction: str) -> str:
+            return encode_cursor({
+                "k": getattr(obj, sort_by),
+                "id": obj.id,
+                "d": cursor_direction,
+            })
+
+        # При движении назад следующая страница заведомо существует
+        if direction == "next":
+            has_next, has_prev = has_more, cursor is not None
+        else:
+            has_next, has_prev = True, has_more
+
+        next_cursor = prev_cursor = None
+        if items and has_next:
+            next_cursor = make_cursor(items[-1], "next")
+        if items and has_prev:
+            prev_cursor = make_cursor(items[0], "prev")
+
+        pages = None
+        if total is not None:
+            pages = 1 if page_size == -1 else (total + page_size - 1) // page_size
+
+        return PagePaginate(
+            values=items,
+            total=total,
+            pages=pages,
+            page_size=page_size,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor
+        )
+
+    @classmethod
+    async def _estimate_total(cls, session: AsyncSession) -> int:
+        """Оценка числа строк таблицы по статистике планировщика."""
+        query = text(
+            "SELECT reltuples::bigint FROM pg_class "
+            "WHERE oid = to_regclass(:table_name)"
+        )
+        estimate = await session.scalar(
+            query, {"table_name": cls.model.__tablename__}
+        )
+        # Для таблиц без собранной статистики reltuples = -1
+        return max(int(estimate or 0), 0)
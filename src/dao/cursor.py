@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    """Кодирует позицию keyset-пагинации в непрозрачную строку."""
+    raw = json.dumps(data, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Разбирает курсор, полученный от encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(data, dict) or data.get("d") not in ("next", "prev"):
+            raise ValueError(cursor)
+        return data
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации",
+        )
+
+
+def coerce_cursor_value(column: Any, value: Any) -> Any:
+    """Приводит значение из курсора к python-типу колонки."""
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if isinstance(value, python_type):
+        return value
+    try:
+        if python_type in (datetime, date):
+            return python_type.fromisoformat(value)
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации",
+        )
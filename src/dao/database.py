@@ -1,9 +1,16 @@
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
 from dotenv import load_dotenv
+from sqlalchemy import DDL, event
 from sqlalchemy.ext.asyncio import (
     AsyncSession, async_sessionmaker, create_async_engine
 )
+from src.dao import instrumentation
+from src.dao.pool_stats import PoolHoldStats, TimedQueuePool
+from src.metrics.registry import REGISTRY
 # Загружаем переменные окружения
 load_dotenv()
 
@@ -17,8 +24,35 @@ POSTGRES_HOST = os.getenv("POSTGRES_HOST", "db")
 # Формируем строку подключения
 DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:5432/{POSTGRES_DB}"
 
+# Печать каждого SQL-запроса в stdout; в продакшене выключена,
+# статистику запросов даёт src.dao.instrumentation
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
 # Создаём асинхронный движок
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+engine = create_async_engine(
+    DATABASE_URL, echo=DB_ECHO, future=True, poolclass=TimedQueuePool
+)
+
+# Время удержания соединений вне пула
+pool_hold_stats = PoolHoldStats()
+pool_hold_stats.install(engine)
+REGISTRY.gauge(
+    "db_pool_checked_out",
+    "Соединения, выданные из пула",
+    callback=lambda: engine.pool.checkedout(),
+)
+REGISTRY.gauge(
+    "db_pool_overflow",
+    "Соединения сверх постоянного размера пула",
+    callback=lambda: max(engine.pool.overflow(), 0),
+)
+REGISTRY.gauge(
+    "db_pool_size",
+    "Постоянный размер пула",
+    callback=lambda: engine.pool.size(),
+)
+# Число и время SQL-запросов в рамках HTTP-запроса
+instrumentation.install(engine)
 
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
@@ -28,8 +62,115 @@ SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=F
 # Базовый класс для моделей
 Base = declarative_base()
 
+# Генерация UUIDv7 на стороне БД: умолчание для id при вставках в обход ORM.
+# Берётся случайный UUIDv4, первые 48 бит заменяются временем в миллисекундах,
+# версия 4 (0100) меняется на 7 (0111)
+UUID7_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+BEGIN
+    RETURN encode(
+        set_bit(
+            set_bit(
+                overlay(
+                    uuid_send(gen_random_uuid())
+                    placing substring(
+                        int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint)
+                        FROM 3
+                    )
+                    FROM 1 FOR 6
+                ),
+                52, 1
+            ),
+            53, 1
+        ),
+        'hex'
+    )::uuid;
+END
+$$ LANGUAGE plpgsql VOLATILE
+"""
+
+# Функция нужна до создания таблиц: на неё ссылается server_default
+event.listen(Base.metadata, "before_create", DDL(UUID7_FUNCTION_DDL))
+
+
+
+class SecondConnectionError(RuntimeError):
+    """Запрос пытается занять второе соединение из пула"""
+
+
+class RequestScope:
+    """Единица работы запроса: его сессия и число занятых им соединений"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.connections = 0
+
+
+# Единица работы текущего запроса; DAO-методы берут из неё сессию,
+# если она не передана явно (см. SessionManager.with_session)
+request_scope: ContextVar[Optional[RequestScope]] = ContextVar(
+    "request_scope", default=None
+)
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _guard_request_checkout(dbapi_connection, connection_record, connection_proxy):
+    """Не даёт одному запросу держать больше одного соединения."""
+    scope = request_scope.get()
+    if scope is None:
+        return
+    if scope.connections >= 1:
+        raise SecondConnectionError(
+            "Запрос пытается занять второе соединение из пула; "
+            "используйте сессию единицы работы запроса"
+        )
+    scope.connections += 1
+    connection_record.info["request_scope"] = scope
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _release_request_checkout(dbapi_connection, connection_record):
+    scope = connection_record.info.pop("request_scope", None)
+    if scope is not None:
+        scope.connections -= 1
+
+
+@asynccontextmanager
+async def unit_of_work(begin: bool = True):
+    """Открывает сессию запроса и делает её доступной через request_scope.
+
+    Параметры:
+        begin - открыть транзакцию на всё время единицы работы.
+    """
+    if request_scope.get() is not None:
+        raise SecondConnectionError("Единица работы запроса уже открыта")
+
+    async with async_session_maker() as session:
+        token = request_scope.set(RequestScope(session))
+        try:
+            if begin:
+                async with session.begin():
+                    yield session
+            else:
+                yield session
+        finally:
+            request_scope.reset(token)
+
+
 # Функция для получения сессии
 async def get_db():
-    async with async_session_maker() as session:
-        async with session.begin():
-            yield session
+    async with unit_of_work() as session:
+        yield session
+
+
+async def get_lazy_db():
+    """Сессия запроса без общей транзакции.
+
+    Соединение берётся из пула только при первом запросе к БД
+    и возвращается туда при завершении каждой транзакции, поэтому
+    между короткими транзакциями (например, на время обращений
+    к Bitrix24) запрос соединение не держит. Транзакции открываются
+    явно через SessionManager.transaction.
+    """
+    async with unit_of_work(begin=False) as session:
+        yield session
@@ -5,6 +5,17 @@ from fastapi import HTTPException, status
 from sqlalchemy.exc import IntegrityError, NoResultFound
 
 
+class UniqueConflictError(Exception):
+    """Запись нарушает ограничение уникальности"""
+
+    def __init__(self, entity: str, constraint: Optional[str]):
+        self.entity = entity
+        self.constraint = constraint
+        super().__init__(
+            f"{entity}: нарушено ограничение уникальности {constraint}"
+        )
+
+
 class DatabaseErrorHandler:
     """Обработчик ошибок базы данных"""
 
@@ -23,11 +34,41 @@ class DatabaseErrorHandler:
         except Exception:
             return None
 
+    @staticmethod
+    def parse_constraint(error_detail: str) -> Optional[str]:
+        """Безопасный парсинг имени ограничения из сообщения об ошибке"""
+        start = error_detail.find('constraint "')
+        if start == -1:
+            return None
+        start += 12
+        end = error_detail.find('"', start)
+        if end == -1:
+            return None
+        return error_detail[start:end]
+
+    @staticmethod
+    def conflict_exception(error: UniqueConflictError) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": f"{error.entity} с такими данными уже существует",
+                "constraint": error.constraint,
+            },
+        )
+
     @staticmethod
     def handle_integrity_error(error: IntegrityError, cls: Any) -> None:
         """Обработка ошибок целостности базы данных"""
         error_detail = str(error.orig)
 
+        # Проверяем нарушения уникальности
+        if "duplicate key value violates unique constraint" in error_detail:
+            raise DatabaseErrorHandler.conflict_exception(
+                UniqueConflictError(
+                    cls._get_entity_name(),
+                    DatabaseErrorHandler.parse_constraint(error_detail),
+                )
+            )
 
         # Проверяем ошибки внешнего ключа
         error_detail_lower = error_detail.lower()
@@ -50,8 +91,10 @@ class DatabaseErrorHandler:
         elif isinstance(error, NoResultFound):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"{cls.model._tablename} не существует",
+                detail=f"{cls._get_entity_name()} не существует",
             )
+        elif isinstance(error, UniqueConflictError):
+            raise DatabaseErrorHandler.conflict_exception(error)
         elif isinstance(error, IntegrityError):
             DatabaseErrorHandler.handle_integrity_error(error, cls)
         raise HTTPException(
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз один и тот же запрос может выполниться за HTTP-запрос,
+# прежде чем это будет считаться признаком N+1
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+# Запросы длиннее порога (в секундах) попадают в журнал целиком
+DB_SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_SECONDS", "0.2"))
+
+
+class QueryStats:
+    """Статистика SQL-запросов одного HTTP-запроса"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Counter = Counter()
+
+    def observe(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        # Параметры передаются отдельно, поэтому одинаковый текст
+        # означает один и тот же запрос с разными значениями
+        self.statements[statement] += 1
+        if seconds > self.slowest:
+            self.slowest = seconds
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int = DB_N_PLUS_ONE_THRESHOLD) -> List[Dict[str, Any]]:
+        """Запросы, повторённые не меньше threshold раз (вероятный N+1)."""
+        return [
+            {"statement": statement, "count": count}
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing."""
+        return (
+            f'db;dur={self.total * 1000:.1f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest * 1000:.1f}"
+        )
+
+
+# Статистика текущего HTTP-запроса; заполняется событиями движка
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started_at"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started_at", None)
+    stats = query_stats.get()
+    if stats is None or started is None:
+        return
+    seconds = time.perf_counter() - started
+    stats.observe(statement, seconds)
+    if seconds >= DB_SLOW_QUERY_SECONDS:
+        logger.warning(json.dumps(
+            {"event": "db.slow_query", "duration_ms": round(seconds * 1000, 1),
+             "statement": statement},
+            ensure_ascii=False,
+        ))
+
+
+def install(engine: AsyncEngine) -> None:
+    """Подписывается на выполнение запросов движком."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """ASGI-middleware: собирает статистику SQL по каждому HTTP-запросу.
+
+    Добавляет в ответ заголовок Server-Timing (число запросов, суммарное
+    и максимальное время в БД) и пишет по запросу одну JSON-строку
+    в журнал, отмечая повторяющиеся запросы (N+1).
+    Для потоковых ответов заголовок отражает запросы, выполненные
+    до начала отправки тела; в журнал попадает итог.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        status_code = None
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats.reset(token)
+            repeated = stats.repeated()
+            record = {
+                "event": "db.request",
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "queries": stats.count,
+                "db_ms": round(stats.total * 1000, 1),
+                "slowest_ms": round(stats.slowest * 1000, 1),
+                "slowest_statement": stats.slowest_statement,
+            }
+            if repeated:
+                record["n_plus_one"] = repeated
+            log = logger.warning if repeated else logger.info
+            log(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,75 @@
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.metrics.registry import REGISTRY
+
+DB_POOL_CHECKOUT_WAIT_SECONDS = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Ожидание свободного соединения из пула",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_HOLD_SECONDS = REGISTRY.histogram(
+    "db_pool_hold_seconds",
+    "Время, которое соединение проводит вне пула",
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий ожидание свободного соединения"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+class PoolHoldStats:
+    """Сколько времени соединения проводят вне пула.
+
+    Время считается от выдачи соединения (checkout) до его возврата
+    (checkin): именно столько соединение недоступно другим запросам,
+    независимо от того, выполняются ли на нём в это время запросы.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.checked_out = 0
+
+    def install(self, engine: AsyncEngine) -> None:
+        """Подписывается на события пула движка."""
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        self.checked_out += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        self.checked_out -= 1
+        self.observe(time.perf_counter() - started)
+
+    def observe(self, seconds: float) -> None:
+        DB_POOL_HOLD_SECONDS.observe(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "checked_out": self.checked_out,
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
@@ -1,11 +1,24 @@
 from pydantic import BaseModel
-from typing import Generic, List, TypeVar
+from typing import Any, Dict, Generic, List, Optional, TypeVar
 
 T = TypeVar("T")
 
 class PagePaginate(BaseModel, Generic[T]):
     values: List[T]
-    total: int
-    page: int
-    pages: int
+    total: Optional[int] = None
+    page: Optional[int] = None
+    pages: Optional[int] = None
     page_size: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class BulkResolve(BaseModel, Generic[T]):
+    values: Dict[Any, T]
+    missing: List[Any]
+
+
+class UpsertResult(BaseModel, Generic[T]):
+    value: Optional[T] = None
+    inserted: bool
+    conflict: Optional[str] = None
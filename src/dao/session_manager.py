@@ -1,27 +1,83 @@
+import time
+from contextlib import asynccontextmanager
 from functools import wraps
 from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.dao.database import async_session_maker
+from src.dao.database import async_session_maker, request_scope
 from src.dao.db_error_handler import DatabaseErrorHandler
+from src.metrics.registry import REGISTRY
+
+DAO_CALL_SECONDS = REGISTRY.histogram(
+    "dao_call_duration_seconds",
+    "Время выполнения методов DAO",
+    ["dao", "method"],
+)
+DAO_CALL_ERRORS = REGISTRY.counter(
+    "dao_call_errors_total",
+    "Число методов DAO, завершившихся ошибкой",
+    ["dao", "method"],
+)
 
 
 class SessionManager:
     """Менеджер сессий для работы с БД"""
 
+    @staticmethod
+    @asynccontextmanager
+    async def transaction(session: AsyncSession):
+        """Короткая транзакция на сессии.
+
+        Если транзакция на сессии уже открыта (сессия из get_db),
+        блок просто выполняется внутри неё; иначе открывается своя,
+        и по выходе из блока соединение возвращается в пул.
+        """
+        if session.in_transaction():
+            yield session
+        else:
+            async with session.begin():
+                yield session
+
     @staticmethod
     def with_session(auto_commit: bool = False): # noqa
         def decorator(func): # noqa
-            @wraps(func) # noqa
-            async def wrapper(
+            async def run(
                     cls: Any,
                     *args: Any,
                     session: AsyncSession = None,
                     **kwargs: Any
             ): # noqa
+                # Внутри запроса используем его сессию, а не открываем новую
+                scope = request_scope.get()
+                ambient = session is None and scope is not None
+                if ambient:
+                    session = scope.session
+
+                # Откатываем при ошибке только то, что открыто или начато
+                # здесь: транзакция вызывающего кода или единицы работы
+                # запроса остаётся её владельцу, иначе ошибка чтения молча
+                # отменила бы все предыдущие записи запроса
+                owned = session is None or (
+                    auto_commit and not session.in_transaction()
+                )
                 try:
                     if session is not None:
+                        # Явно переданная сессия внутри транзакции принадлежит
+                        # вызывающему коду (SessionManager.transaction);
+                        # вложенный вызов на сессии запроса - точка сохранения
+                        if auto_commit and ambient and session.in_transaction():
+                            async with session.begin_nested():
+                                result = await func(
+                                    cls, *args, session=session, **kwargs
+                                )
+                                return result
+                        if auto_commit and not session.in_transaction():
+                            async with session.begin():
+                                result = await func(
+                                    cls, *args, session=session, **kwargs
+                                )
+                                return result
                         result = await func(
                             cls, *args, session=session, **kwargs
                         )
@@ -40,9 +96,29 @@ class SessionManager:
                             )
                             return result
                 except Exception as e:
-                    await session.rollback()
+                    # Точка сохранения уже откачена, внешняя транзакция цела
+                    if owned:
+                        await session.rollback()
                     DatabaseErrorHandler.handle_error(e, cls)
 
+            @wraps(func) # noqa
+            async def wrapper(
+                    cls: Any,
+                    *args: Any,
+                    session: AsyncSession = None,
+                    **kwargs: Any
+            ): # noqa
+                start = time.perf_counter()
+                try:
+                    return await run(cls, *args, session=session, **kwargs)
+                except Exception:
+                    DAO_CALL_ERRORS.labels(cls.__name__, func.__name__).inc()
+                    raise
+                finally:
+                    DAO_CALL_SECONDS.labels(cls.__name__, func.__name__).observe(
+                        time.perf_counter() - start
+                    )
+
             return wrapper
 
         return decorator
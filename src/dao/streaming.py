@@ -0,0 +1,56 @@
+import os
+from typing import Any, AsyncIterator, Callable, List, Literal
+
+from fastapi.responses import StreamingResponse
+
+# Размер порции строк, читаемых через серверный курсор
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+
+StreamFormat = Literal["json", "ndjson"]
+
+
+async def _ndjson(
+    chunks: AsyncIterator[List[Any]],
+    serialize: Callable[[Any], str],
+) -> AsyncIterator[str]:
+    async for chunk in chunks:
+        if chunk:
+            yield "".join(f"{serialize(item)}\n" for item in chunk)
+
+
+async def _json_array(
+    chunks: AsyncIterator[List[Any]],
+    serialize: Callable[[Any], str],
+) -> AsyncIterator[str]:
+    separator = "["
+    async for chunk in chunks:
+        if chunk:
+            yield separator + ",".join(serialize(item) for item in chunk)
+            separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+def stream_response(
+    chunks: AsyncIterator[List[Any]],
+    serialize: Callable[[Any], str],
+    stream_format: StreamFormat = "json",
+) -> StreamingResponse:
+    """Отдаёт порции записей клиенту по мере их чтения из БД.
+
+    Параметры:
+        chunks - асинхронный итератор порций записей
+        (например, BaseDAO.stream_chunks).
+        serialize - функция, превращающая запись в JSON-строку.
+        stream_format - json (массив, отдаваемый по частям)
+        или ndjson (одна запись на строку).
+    Возвращает:
+        StreamingResponse; в памяти одновременно находится
+        не больше одной порции записей.
+    """
+    if stream_format == "ndjson":
+        return StreamingResponse(
+            _ndjson(chunks, serialize), media_type="application/x-ndjson"
+        )
+    return StreamingResponse(
+        _json_array(chunks, serialize), media_type="application/json"
+    )
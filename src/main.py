@@ -1,10 +1,38 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from src.bitrix.client import bitrix_client
 from src.dao.database import Base, engine
+from src.dao.instrumentation import QueryStatsMiddleware
+from src.metrics.collectors import register_collectors
+from src.metrics.middleware import MetricsMiddleware
+from src.metrics.router import router_metrics
+from src.utils.deadline import DeadlineMiddleware
+from src.users.password import password_hasher
 from src.users.router import router as user_router
 from src.ticket.router import router_tick as ticket_router
 
-app = FastAPI()
+
+# Функция для создания таблиц в базе (используется при старте приложения)
+async def create_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await create_tables()
+    # Пул соединений Bitrix24 живёт всё время работы приложения
+    await bitrix_client.start()
+    try:
+        yield
+    finally:
+        await bitrix_client.close()
+        password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Настройка CORS: разрешаем запросы с указанных источников (например, с фронтенда на http://localhost:3000)
 origins = [
@@ -25,18 +53,18 @@ app.add_middleware(
 
 )
 
+# Статистика SQL по каждому запросу: заголовок Server-Timing и журнал
+app.add_middleware(QueryStatsMiddleware)
+# Дедлайн обработки запроса для исходящих вызовов (X-Request-Timeout)
+app.add_middleware(DeadlineMiddleware)
+# Длительность и число запросов по маршрутам для /metrics
+app.add_middleware(MetricsMiddleware)
+register_collectors()
+
 # Подключение маршрутов
 app.include_router(user_router, prefix="/api", tags=["user"])
 app.include_router(ticket_router, prefix="/api", tags=["ticket"])
-
-# Функция для создания таблиц в базе (используется при старте приложения)
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-@app.on_event("startup")
-async def on_startup():
-    await create_tables()
+app.include_router(router_metrics, tags=["metrics"])
 
 @app.get("/")
 async def read_root():
@@ -0,0 +1,72 @@
+from typing import Dict, Tuple
+
+from src.dao.database import pool_hold_stats
+from src.metrics.registry import REGISTRY, Registry
+from src.ticket.dao import TicketDAO
+from src.users.password import password_hasher
+from src.users.principal_cache import principal_cache
+
+
+def _caches() -> Dict[str, Dict[str, int]]:
+    return {
+        "bitrix_users_by_id": TicketDAO.users_by_id_cache.stats,
+        "bitrix_users_by_email": TicketDAO.users_by_email_cache.stats,
+        "principal": principal_cache.stats,
+    }
+
+
+def _cache_events() -> Dict[Tuple[str, str], int]:
+    return {
+        (cache, event): stats[event]
+        for cache, stats in _caches().items()
+        for event in ("hits", "negative_hits", "misses", "evictions")
+    }
+
+
+def register_collectors(registry: Registry = REGISTRY) -> None:
+    """Экспортирует счётчики, которые уже ведут кэши, хэшер паролей и пул БД."""
+    registry.counter(
+        "cache_events_total",
+        "Обращения к in-process кэшам",
+        ["cache", "event"],
+        callback=_cache_events,
+    )
+    registry.gauge(
+        "cache_entries",
+        "Число записей в in-process кэшах",
+        ["cache"],
+        callback=lambda: {cache: stats["size"] for cache, stats in _caches().items()},
+    )
+    registry.gauge(
+        "password_hasher_pending",
+        "Операции хэширования паролей в работе и в очереди",
+        callback=lambda: password_hasher.pending,
+    )
+    registry.counter(
+        "password_hasher_rejected_total",
+        "Операции хэширования, отклонённые из-за переполнения очереди",
+        callback=lambda: password_hasher.rejected,
+    )
+    registry.counter(
+        "password_hasher_operations_total",
+        "Выполненные операции хэширования и проверки паролей",
+        ["operation"],
+        callback=lambda: {
+            "hash": password_hasher.hash_latency.count,
+            "verify": password_hasher.verify_latency.count,
+        },
+    )
+    registry.counter(
+        "password_hasher_seconds_total",
+        "Суммарное время операций хэширования и проверки паролей",
+        ["operation"],
+        callback=lambda: {
+            "hash": password_hasher.hash_latency.total,
+            "verify": password_hasher.verify_latency.total,
+        },
+    )
+    registry.gauge(
+        "db_pool_hold_max_seconds",
+        "Максимальное время удержания соединения вне пула",
+        callback=lambda: pool_hold_stats.max,
+    )
@@ -0,0 +1,63 @@
+import time
+
+from src.metrics.registry import REGISTRY
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "Число HTTP-запросов",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route"],
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight",
+    "HTTP-запросы, обрабатываемые в данный момент",
+    ["method"],
+)
+
+
+def _route_name(scope) -> str:
+    # Шаблон пути маршрута, а не сам путь: иначе число меток не ограничено
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: длительность и число запросов по маршрутам.
+
+    Время считается до отправки последней части тела ответа,
+    поэтому потоковые ответы учитываются целиком.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            route = _route_name(scope)
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(
+                time.perf_counter() - start
+            )
+            HTTP_REQUESTS.labels(method, route, status_code).inc()
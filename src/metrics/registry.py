@@ -0,0 +1,242 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Границы гистограмм длительности по умолчанию, в секундах
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Базовая метрика с необязательными метками.
+
+    Запись - обычные операции над числами в словаре без блокировок:
+    всё приложение работает в одном event loop, а значения читаются
+    только при выдаче /metrics.
+    Если задан callback, значения не записываются, а вычисляются при
+    выдаче: так экспортируются счётчики, которые уже ведут другие модули.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], object]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._children: Dict[LabelValues, "Metric"] = {}
+
+    def labels(self, *values: str):
+        """Дочерняя метрика для набора значений меток (создаётся один раз)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(
+                    f"Метрика {self.name} ожидает метки {self.labelnames}"
+                )
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self) -> "Metric":
+        raise NotImplementedError
+
+    def _samples(self, labels: Dict[str, str]) -> Iterator[Sample]:
+        raise NotImplementedError
+
+    def collect(self) -> Iterator[Sample]:
+        if self.callback is not None:
+            yield from self._collect_callback()
+            return
+        if not self.labelnames:
+            yield from self._samples({})
+            return
+        for values, child in list(self._children.items()):
+            yield from child._samples(dict(zip(self.labelnames, values)))
+
+    def _collect_callback(self) -> Iterator[Sample]:
+        # callback возвращает число либо словарь {значения меток: число}
+        result = self.callback()
+        if not isinstance(result, dict):
+            yield self.name, {}, result
+            return
+        for values, value in result.items():
+            if not isinstance(values, tuple):
+                values = (values,)
+            yield self.name, dict(zip(self.labelnames, map(str, values))), value
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик"""
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], object]] = None,
+    ):
+        super().__init__(name, documentation, labelnames, callback)
+        self.value = 0.0
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def _samples(self, labels: Dict[str, str]) -> Iterator[Sample]:
+        yield self.name, labels, self.value
+
+
+class Gauge(Metric):
+    """Значение, которое может расти и уменьшаться"""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], object]] = None,
+    ):
+        super().__init__(name, documentation, labelnames, callback)
+        self.value = 0.0
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def _samples(self, labels: Dict[str, str]) -> Iterator[Sample]:
+        yield self.name, labels, self.value
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам (кумулятивно при выдаче)"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Последняя ячейка - значения больше верхней границы (+Inf)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def _samples(self, labels: Dict[str, str]) -> Iterator[Sample]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            yield (
+                f"{self.name}_bucket",
+                {**labels, "le": _format_value(bound)},
+                cumulative,
+            )
+        yield f"{self.name}_sum", labels, self.sum
+        yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    """Набор метрик, выдаваемых в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], object]] = None,
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], object]] = None,
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате экспозиции Prometheus 0.0.4."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.collect():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр приложения
+REGISTRY = Registry()
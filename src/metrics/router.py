@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.metrics.registry import REGISTRY
+
+router_metrics = APIRouter()
+
+
+@router_metrics.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики приложения в текстовом формате Prometheus."""
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
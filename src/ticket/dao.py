@@ -1,37 +1,142 @@
 # файл: src/dao/dao.py
 
+import hashlib
+import json
+import os
 import uuid
-import aiohttp
-from typing import List
-from sqlalchemy import Sequence
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import Sequence, and_, or_
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from src.users.models import User
-from src.ticket.models import Ticket
+from src.ticket.models import ChatSyncState, Ticket
 from src.dao.base import BaseDAO
+from src.dao.session_manager import SessionManager
+from src.bitrix.batch import BitrixBatch
+from src.bitrix.client import bitrix_client
+from src.bitrix.coalesce import coalesced
+from src.utils.cache import NEGATIVE, TTLCache
+from src.utils.concurrency import gather_bounded
+
+# Настройки кэша пользователей Bitrix24
+BITRIX_USER_CACHE_SIZE = int(os.getenv("BITRIX_USER_CACHE_SIZE", "1024"))
+BITRIX_USER_CACHE_TTL = float(os.getenv("BITRIX_USER_CACHE_TTL", "600"))
+BITRIX_USER_CACHE_NEGATIVE_TTL = float(
+    os.getenv("BITRIX_USER_CACHE_NEGATIVE_TTL", "30")
+)
+# Максимум одновременных шагов при сборке данных тикета
+TICKET_FANOUT_LIMIT = int(os.getenv("TICKET_FANOUT_LIMIT", "4"))
+# im.dialog.messages.get отдаёт не больше 50 сообщений за вызов
+BITRIX_MESSAGES_PAGE_LIMIT = 50
+# Сколько страниц сообщений чата загружается за одну синхронизацию;
+# остальная история догружается при следующих обращениях
+CHAT_SYNC_MAX_PAGES = int(os.getenv("CHAT_SYNC_MAX_PAGES", "10"))
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _format_date(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class ChatSyncStateDAO(BaseDAO[ChatSyncState]):
+    model = ChatSyncState
+
+    @classmethod
+    async def get_state(
+        cls,
+        chat_id: str,
+        session: AsyncSession,
+        for_update: bool = False
+    ) -> Optional[ChatSyncState]:
+        """
+        Состояние синхронизации чата или None, если чат ещё не загружался.
+        for_update=True блокирует строку до конца транзакции, как и save.
+        """
+        return await session.get(
+            ChatSyncState,
+            chat_id,
+            with_for_update=for_update,
+            populate_existing=for_update,
+        )
+
+    @classmethod
+    @SessionManager.with_session(auto_commit=True)
+    async def save(cls, session: AsyncSession, values: Dict[str, Any]) -> bool:
+        """
+        Сохраняет состояние синхронизации чата.
+        Состояние не откатывается назад: запись проходит, только если
+        она не теряет ничего из сохранённого (отметка не меньше, начало
+        загруженной истории не позже, история не становится неполной)
+        и что-то добавляет. Иначе параллельная синхронизация уже записала
+        более полное состояние, и запись пропускается.
+        Возвращает True, если строка записана.
+        """
+        values = {**values, "synced_at": datetime.utcnow()}
+        query = pg_insert(ChatSyncState).values(values)
+        excluded = query.excluded
+        query = query.on_conflict_do_update(
+            index_elements=[ChatSyncState.chat_id],
+            set_={
+                field: excluded[field]
+                for field in values if field != "chat_id"
+            },
+            where=and_(
+                ChatSyncState.last_message_id <= excluded.last_message_id,
+                ChatSyncState.first_message_id >= excluded.first_message_id,
+                or_(excluded.history_complete, ~ChatSyncState.history_complete),
+                or_(
+                    ChatSyncState.last_message_id < excluded.last_message_id,
+                    ChatSyncState.first_message_id > excluded.first_message_id,
+                    ChatSyncState.history_complete != excluded.history_complete,
+                ),
+            ),
+        ).returning(ChatSyncState.chat_id)
+        result = await session.execute(query)
+        return result.scalar_one_or_none() is not None
+
 
 class TicketDAO(BaseDAO[Ticket]):
     model = Ticket
-    WEBHOOK_URL = "https://b24-ro4m0k.bitrix24.ru/rest/1"
     roles_access = ["admin", "manager"]
+
+    # Кэш user.get: соответствие оператор -> email меняется крайне редко
+    users_by_id_cache = TTLCache(
+        maxsize=BITRIX_USER_CACHE_SIZE,
+        ttl=BITRIX_USER_CACHE_TTL,
+        negative_ttl=BITRIX_USER_CACHE_NEGATIVE_TTL,
+    )
+    users_by_email_cache = TTLCache(
+        maxsize=BITRIX_USER_CACHE_SIZE,
+        ttl=BITRIX_USER_CACHE_TTL,
+        negative_ttl=BITRIX_USER_CACHE_NEGATIVE_TTL,
+    )
+
+    @classmethod
+    def _cache_user_info(cls, user_info: dict) -> None:
+        """Сохраняет пользователя Bitrix24 в кэши по ID и по email."""
+        if user_info.get("ID"):
+            cls.users_by_id_cache.set(str(user_info["ID"]), user_info)
+        if user_info.get("EMAIL"):
+            cls.users_by_email_cache.set(user_info["EMAIL"].lower(), user_info)
+
     @classmethod
     async def get_user_info(cls, bitrix_user_id: Optional[int] = None, email: Optional[str] = None) -> dict:
         """
         Получает информацию о пользователе по его Bitrix ID или email через метод user.get (из Bitrix24).
         Обязательно должен быть передан хотя бы один из параметров.
+        Результаты (в том числе «не найден») кэшируются, если передан только один параметр.
         """
         if not bitrix_user_id and not email:
             raise ValueError("Необходимо передать хотя бы один параметр: bitrix_user_id или email")
 
-        url = f"{cls.WEBHOOK_URL}/7c2l2pndd6rmc44g/user.get.json"
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-
         # Формируем фильтр: добавляем ключи, если соответствующие значения переданы
         filter_params = {}
         if bitrix_user_id:
@@ -41,152 +146,442 @@ class TicketDAO(BaseDAO[Ticket]):
 
         payload = {"filter": filter_params}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if not data.get("result") or len(data["result"]) == 0:
-                        raise Exception(f"Пользователь с параметрами {payload['filter']} не найден в Bitrix24")
-                    return data["result"][0]
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"Ошибка запроса: {response.status}, {error_text}")
+        cache, cache_key = None, None
+        if bitrix_user_id and not email:
+            cache, cache_key = cls.users_by_id_cache, str(bitrix_user_id)
+        elif email and not bitrix_user_id:
+            cache, cache_key = cls.users_by_email_cache, email.lower()
+
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is NEGATIVE:
+                raise Exception(f"Пользователь с параметрами {payload['filter']} не найден в Bitrix24")
+            if cached is not None:
+                return cached
+
+        data = await bitrix_client.call("user.get", "POST", json=payload)
+        if not data.get("result") or len(data["result"]) == 0:
+            if cache is not None:
+                cache.set_negative(cache_key)
+            raise Exception(f"Пользователь с параметрами {payload['filter']} не найден в Bitrix24")
+        cls._cache_user_info(data["result"][0])
+        return data["result"][0]
 
     @classmethod
+    async def get_users_info(cls, bitrix_user_ids: List[int]) -> Dict[int, dict]:
+        """
+        Получает информацию о нескольких пользователях Bitrix24 за минимальное
+        число запросов: найденные в кэше берутся из него, остальные вызовы
+        user.get уходят одной командой batch (до 50 команд за запрос).
+        Возвращает словарь {bitrix_user_id: данные};
+        не найденные пользователи в словарь не попадают.
+        """
+        users_info = {}
+        batch = BitrixBatch()
+        pending = {}
+        for bitrix_user_id in dict.fromkeys(bitrix_user_ids):
+            cached = cls.users_by_id_cache.get(str(bitrix_user_id))
+            if cached is NEGATIVE:
+                continue
+            if cached is not None:
+                users_info[bitrix_user_id] = cached
+                continue
+            key = batch.add(
+                f"user_{bitrix_user_id}",
+                "user.get",
+                {"filter": {"ID": str(bitrix_user_id)}},
+            )
+            pending[key] = bitrix_user_id
+        if not pending:
+            return users_info
+
+        result = await batch.execute()
+        for key, bitrix_user_id in pending.items():
+            users = result.get(key)
+            if users:
+                users_info[bitrix_user_id] = users[0]
+                cls._cache_user_info(users[0])
+            else:
+                cls.users_by_id_cache.set_negative(str(bitrix_user_id))
+        return users_info
+
+    @classmethod
+    @coalesced()
     async def get_recent_chats(cls) -> set:
         """
         Возвращает множество chat_id, у которых идентификатор начинается с "chat"
         и заголовок содержит слово "открыт" (через Bitrix24).
+        Одновременные вызовы объединяются в один запрос, результат
+        кэшируется на несколько секунд и не должен изменяться.
         """
-        url = f"{cls.WEBHOOK_URL}/fx3u6sfrdgcemvn0/im.recent.list.json"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    chat_ids = set()
-                    if data.get("result"):
-                        for chat in data["result"]["items"]:
-                            if (str(chat.get('id', '')).startswith("chat") and
-                                "открыт" in str(chat.get('title', '')).lower()):
-                                chat_ids.add(chat['id'])
-                        return chat_ids
-                    else:
-                        raise Exception("Данные не найдены.")
-                else:
-                    text = await response.text()
-                    raise Exception(f"Ошибка: {response.status} - {text}")
+        data = await bitrix_client.call("im.recent.list")
+        chat_ids = set()
+        if data.get("result"):
+            for chat in data["result"]["items"]:
+                if (str(chat.get('id', '')).startswith("chat") and
+                    "открыт" in str(chat.get('title', '')).lower()):
+                    chat_ids.add(chat['id'])
+            return chat_ids
+        else:
+            raise Exception("Данные не найдены.")
 
-    @classmethod
-    async def get_chat_messages(cls, chat_id: str, limit: int = 100) -> dict:
-        """
-        Получает сообщения чата (через Bitrix24), возвращает структуру данных о чате.
-        """
-        url = f"{cls.WEBHOOK_URL}/vxokddeh6q71x9gi/im.dialog.messages.get"
-        params = {"DIALOG_ID": chat_id, "LIMIT": limit}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("result"):
-                        messages = data["result"].get("messages", [])
-                        if not messages:
-                            return {
-                                "chat_id": chat_id,
-                                "ticket_id": data["result"].get("chat_id", chat_id),
-                                "first_message_date": None,
-                                "last_message_date": None,
-                                "operator_ids": [],
-                                "messages": {},
-                                "is_resolved": False
-                            }
-
-                        messages_sorted = sorted(messages, key=lambda msg: msg.get("date"))
-                        first_message_date = messages_sorted[0].get("date")
-                        last_message_date = messages_sorted[-1].get("date")
-
-                        # Преобразуем список пользователей в словарь для быстрого доступа
-                        users_by_id = {
-                            str(user["id"]): user
-                            for user in data["result"]["users"]
-                        }
-
-                        # Определяем идентификаторы операторов (не гости и не id=0)
-                        operator_ids = list({
-                            msg["author_id"]
-                            for msg in data["result"]["messages"]
-                            if ( msg.get("author_id")
-                                 and int(msg["author_id"]) != 0
-                                 and users_by_id.get(str(msg["author_id"]), {}).get("name") != "Гость")
-                        })
-
-                        ticket_id = data["result"].get("chat_id", chat_id)
-                        last_message_text = messages_sorted[-1].get("text", "").lower()
-                        is_resolved = ("решен" in last_message_text) or ("закрыт" in last_message_text)
-                        messages_dict = {
-                            msg.get("text", ""): msg.get("date") for msg in messages_sorted
-                        }
-
-                        return {
-                            "chat_id": chat_id,
-                            "ticket_id": ticket_id,
-                            "first_message_date": first_message_date,
-                            "last_message_date": last_message_date,
-                            "operator_ids": operator_ids,
-                            "messages": messages_dict,
-                            "is_resolved": is_resolved,
-                        }
-                    else:
-                        raise Exception("Ошибка: данные не найдены в ответе Bitrix")
-                else:
-                    text = await response.text()
-                    raise Exception(f"Ошибка запроса: {response.status} - {text}")
+    @staticmethod
+    def _operator_ids(result: dict) -> set:
+        """Идентификаторы операторов в ответе im.dialog.messages.get."""
+        # Преобразуем список пользователей в словарь для быстрого доступа
+        users_by_id = {
+            str(user["id"]): user
+            for user in result.get("users", [])
+        }
+
+        # Операторы - авторы сообщений, не гости и не id=0
+        return {
+            msg["author_id"]
+            for msg in result.get("messages", [])
+            if ( msg.get("author_id")
+                 and int(msg["author_id"]) != 0
+                 and users_by_id.get(str(msg["author_id"]), {}).get("name") != "Гость")
+        }
 
     @classmethod
-    async def get_chat_messages_with_role_check(
-        cls,
-        chat_id: str,
-        user_id: uuid.UUID,       # По факту у вас UUID (строка в URL), но хранится в БД как UUID
-        limit: int,
-        db: AsyncSession
-    ) -> dict:
+    async def check_role(cls, user_id: uuid.UUID, db: AsyncSession) -> User:
         """
         Проверяет наличие пользователя в локальной БД и его роль.
-        Если роль допустимая, запрашивает сообщения чата через Bitrix24.
+        На сессии без открытой транзакции чтение выполняется в своей
+        короткой транзакции, и соединение сразу возвращается в пул.
         """
-        # Проверяем наличие пользователя в базе данных
-        result = await db.execute(select(User).where(user_id == User.id))
-        user_obj = result.scalars().first()
+        async with SessionManager.transaction(db):
+            result = await db.execute(select(User).where(user_id == User.id))
+            user_obj = result.scalars().first()
         if not user_obj:
             raise Exception(f"Пользователь с ID {user_id} не найден в локальной БД")
 
         if user_obj.role not in cls.roles_access:
             raise Exception("У вас нет доступа к этой функции (role check failed)")
-        # Если всё хорошо — запрашиваем сообщения из Bitrix
-        chat_data = await cls.get_chat_messages(chat_id, limit)
-        return chat_data
+        return user_obj
+
+    @classmethod
+    async def get_operators_info(cls, chat_id: str) -> Dict[int, dict]:
+        """
+        Возвращает ответственных операторов чата с их данными из Bitrix24
+        в виде словаря {bitrix_user_id: данные} в порядке manager_list.
+        """
+        operator_ids = await cls.responsible_operators(chat_id=chat_id)
+        if not operator_ids:
+            raise Exception("Ответственные операторы не найдены")
+
+        # Все операторы запрашиваются одним batch-вызовом Bitrix24
+        operators_info = await cls.get_users_info(operator_ids)
+        for operator in operator_ids:
+            if operator not in operators_info:
+                raise Exception(f"Пользователь с ID {operator} не найден в Bitrix24")
+        return {operator: operators_info[operator] for operator in operator_ids}
 
+    # Без stale-окна: страница после отметки не должна подолгу
+    # скрывать новые сообщения
     @classmethod
-    async def get_all(cls, db: AsyncSession) -> List[Ticket]:
+    @coalesced(stale_ttl=0)
+    async def _messages_page(
+        cls,
+        chat_id: str,
+        page_size: int,
+        first_id: Optional[int] = None,
+        last_id: Optional[int] = None,
+    ) -> dict:
+        """Одна страница im.dialog.messages.get.
+
+        first_id - сообщения новее указанного, last_id - старше указанного.
+        Одновременные синхронизации одного чата с тем же курсором
+        объединяются в один запрос; результат не должен изменяться.
         """
-        Получает все тикеты из базы данных.
+        params = {"DIALOG_ID": chat_id, "LIMIT": page_size}
+        if first_id is not None:
+            params["FIRST_ID"] = first_id
+        if last_id is not None:
+            params["LAST_ID"] = last_id
+        data = await bitrix_client.call("im.dialog.messages.get", params=params)
+        if not data.get("result"):
+            raise Exception("Ошибка: данные не найдены в ответе Bitrix")
+        return data["result"]
+
+    @staticmethod
+    def _state_values(state: ChatSyncState) -> Dict[str, Any]:
+        """Сохранённое состояние синхронизации в виде значений для save."""
+        return {
+            column: getattr(state, column)
+            for column in (
+                "chat_id", "ticket_id", "last_message_id", "first_message_id",
+                "history_complete", "first_message_date", "last_message_date",
+                "operator_ids", "dialogue", "is_resolved",
+            )
+        }
+
+    @staticmethod
+    def _chat_data(chat_id: str, state: Any) -> dict:
+        """Данные чата из состояния синхронизации."""
+        return {
+            "chat_id": chat_id,
+            "ticket_id": state["ticket_id"] or chat_id,
+            "first_message_date": _format_date(state["first_message_date"]),
+            "last_message_date": _format_date(state["last_message_date"]),
+            "operator_ids": state["operator_ids"],
+            "messages": state["dialogue"],
+            "is_resolved": state["is_resolved"],
+        }
+
+    @classmethod
+    def stored_chat_data(cls, state: ChatSyncState) -> dict:
+        """Данные чата из сохранённого состояния синхронизации."""
+        return cls._chat_data(state.chat_id, cls._state_values(state))
+
+    @staticmethod
+    def _is_resolved(message: dict) -> bool:
+        """Чат считается решённым по тексту последнего сообщения."""
+        text = message.get("text", "").lower()
+        return ("решен" in text) or ("закрыт" in text)
+
+    @classmethod
+    async def fetch_chat_updates(
+        cls,
+        chat_id: str,
+        state: Optional[ChatSyncState],
+        page_size: int = BITRIX_MESSAGES_PAGE_LIMIT,
+        max_pages: int = CHAT_SYNC_MAX_PAGES,
+    ) -> Tuple[dict, Optional[Dict[str, Any]]]:
         """
-        result = await db.execute(select(Ticket))
-        tickets = result.scalars().all()
-        return tickets
+        Догружает из Bitrix24 сообщения чата, которых нет в сохранённом
+        состоянии, и добавляет их к диалогу.
+        Сначала запрашиваются сообщения после последнего известного
+        (FIRST_ID) - для чата без новых сообщений это один короткий вызов.
+        Пока история не загружена целиком, затем догружаются более старые
+        страницами от самого раннего загруженного сообщения назад (LAST_ID).
+        За один вызов запрашивается не больше max_pages страниц: длинная
+        история загружается за несколько обращений, каждое из которых
+        укладывается в дедлайн запроса и сохраняет свой прогресс.
+        Возвращает кортеж (данные чата, значения для ChatSyncStateDAO.save
+        или None, если состояние не изменилось).
+        """
+        page_size = max(1, min(page_size, BITRIX_MESSAGES_PAGE_LIMIT))
+        newer: Dict[int, dict] = {}
+        older: Dict[int, dict] = {}
+        operator_ids: set = set()
+        ticket_id = state.ticket_id if state is not None else None
+        history_complete = state.history_complete if state is not None else False
+        pages = 0
+
+        # Новые сообщения после отметки: курсор FIRST_ID идёт вперёд
+        if state is not None:
+            first_id = state.last_message_id
+            while pages < max_pages:
+                result = await cls._messages_page(chat_id, page_size, first_id=first_id)
+                pages += 1
+                ticket_id = result.get("chat_id", ticket_id)
+                operator_ids |= cls._operator_ids(result)
+                page = result.get("messages", [])
+                fresh = [msg for msg in page if int(msg["id"]) > first_id]
+                newer.update((int(msg["id"]), msg) for msg in fresh)
+                # Если курсор не сдвинулся, дальше данных нет
+                if len(page) < page_size or not fresh:
+                    break
+                first_id = max(newer)
+
+        # Более старые сообщения, пока история не загружена целиком:
+        # курсор LAST_ID идёт назад от самого раннего загруженного
+        last_id = state.first_message_id if state is not None else None
+        while not history_complete and pages < max_pages:
+            result = await cls._messages_page(chat_id, page_size, last_id=last_id)
+            pages += 1
+            ticket_id = result.get("chat_id", ticket_id)
+            operator_ids |= cls._operator_ids(result)
+            page = result.get("messages", [])
+            earlier = [
+                msg for msg in page if last_id is None or int(msg["id"]) < last_id
+            ]
+            older.update((int(msg["id"]), msg) for msg in earlier)
+            if len(page) < page_size or not earlier:
+                history_complete = True
+                break
+            last_id = min(older)
+
+        if state is None and not older:
+            return {
+                "chat_id": chat_id,
+                "ticket_id": ticket_id or chat_id,
+                "first_message_date": None,
+                "last_message_date": None,
+                "operator_ids": [],
+                "messages": {},
+                "is_resolved": False
+            }, None
+        if (
+            state is not None
+            and not newer
+            and not older
+            and history_complete == state.history_complete
+        ):
+            return cls.stored_chat_data(state), None
+
+        def order(msg: dict) -> tuple:
+            return msg.get("date") or "", int(msg["id"])
+
+        older_sorted = sorted(older.values(), key=order)
+        newer_sorted = sorted(newer.values(), key=order)
+        # Более старые сообщения встают в начало диалога, новые - в конец
+        dialogue = {msg.get("text", ""): msg.get("date") for msg in older_sorted}
+        if state is not None:
+            dialogue.update(state.dialogue)
+        for msg in newer_sorted:
+            dialogue[msg.get("text", "")] = msg.get("date")
+
+        ids = [*older, *newer]
+        if state is not None:
+            ids += [state.first_message_id, state.last_message_id]
+        # Самое новое сообщение, если оно загружено в этот раз
+        newest = (
+            newer_sorted[-1] if newer_sorted
+            else older_sorted[-1] if state is None
+            else None
+        )
+        known_operators = state.operator_ids if state is not None else []
+
+        values = {
+            "chat_id": chat_id,
+            "ticket_id": str(ticket_id) if ticket_id is not None else None,
+            "last_message_id": max(ids),
+            "first_message_id": min(ids),
+            "history_complete": history_complete,
+            "first_message_date": (
+                _parse_date(older_sorted[0].get("date"))
+                if older_sorted else state.first_message_date
+            ),
+            "last_message_date": (
+                _parse_date(newest.get("date"))
+                if newest is not None else state.last_message_date
+            ),
+            "operator_ids": list(dict.fromkeys([*known_operators, *operator_ids])),
+            "dialogue": dialogue,
+            "is_resolved": (
+                cls._is_resolved(newest)
+                if newest is not None else state.is_resolved
+            ),
+        }
+        return cls._chat_data(chat_id, values), values
+
+    @classmethod
+    async def get_chat_with_operators(
+        cls,
+        chat_id: str,
+        user_id: uuid.UUID,
+        limit: int,
+        db: AsyncSession
+    ) -> Tuple[dict, Dict[int, dict], Optional[Dict[str, Any]]]:
+        """
+        Проверяет роль пользователя, затем конкурентно догружает новые
+        сообщения чата и получает ответственных операторов.
+        Роль и состояние синхронизации читаются одной короткой
+        транзакцией, и к Bitrix24 не уходит ни одного запроса, пока
+        проверка роли не пройдена: чужой user_id не расходует лимит
+        запросов портала. Время загрузки определяется самым медленным
+        из шагов, а не их суммой; при ошибке любого шага остальные
+        отменяются.
+        Возвращает кортеж (данные чата, операторы с данными из Bitrix24,
+        новое состояние синхронизации или None).
+        """
+        async with SessionManager.transaction(db):
+            await cls.check_role(user_id, db)
+            state = await ChatSyncStateDAO.get_state(chat_id, db)
+
+        # Дальше только Bitrix24: с ленивой сессией (get_lazy_db)
+        # соединение уже возвращено в пул и не удерживается на время вызовов
+        (chat_data, sync_state), operators_info = await gather_bounded(
+            cls.fetch_chat_updates(chat_id, state, page_size=limit),
+            cls.get_operators_info(chat_id),
+            limit=TICKET_FANOUT_LIMIT,
+        )
+        return chat_data, operators_info, sync_state
+
+    @staticmethod
+    def content_hash(dialogue: Any, status: str) -> str:
+        """sha256 от содержимого тикета в каноническом JSON."""
+        raw = json.dumps(
+            {"dialogue": dialogue, "status": status},
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @classmethod
+    def _copy_row(cls, record: Dict[str, Any], columns: List[Any]) -> tuple:
+        """Строка COPY с content_hash, как его считает ingest_chat.
+
+        Без хэша первая же загрузка чата после copy_in перезаписала бы
+        каждый скопированный тикет. Хэш попадает в таблицу, только если
+        колонка content_hash загружается (и, при конфликтах, обновляется).
+        """
+        if "content_hash" not in record and "dialogue" in record:
+            status = record.get("status", Ticket.status.default.arg)
+            record = {
+                **record,
+                "content_hash": cls.content_hash(record["dialogue"], status),
+            }
+        return super()._copy_row(record, columns)
+
+    @classmethod
+    @SessionManager.with_session(auto_commit=True)
+    async def ingest_chat(
+        cls,
+        session: AsyncSession,
+        values: Dict[str, Any],
+        user_ids: List[uuid.UUID],
+    ) -> int:
+        """
+        Идемпотентно сохраняет тикеты чата: по одному на оператора,
+        ключ - (chat_id, user_id).
+        Сначала читаются хэши уже сохранённых тикетов; строки с тем же
+        содержимым пропускаются, так что повторная загрузка неизменного
+        чата не пишет в БД ничего. Новые и изменившиеся строки
+        записываются одним INSERT ... ON CONFLICT DO UPDATE.
+        Возвращает число записанных строк.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        content_hash = cls.content_hash(values["dialogue"], values["status"])
+
+        result = await session.execute(
+            select(Ticket.user_id, Ticket.content_hash).where(
+                Ticket.chat_id == values["chat_id"],
+                cls._any_of(Ticket.user_id, user_ids),
+            )
+        )
+        stored = dict(result.all())
+        rows = [
+            {**values, "user_id": user_id, "content_hash": content_hash}
+            for user_id in user_ids
+            if stored.get(user_id) != content_hash
+        ]
+        if not rows:
+            return 0
+
+        # only_if_changed защищает от перезаписи, если параллельный
+        # запрос уже сохранил то же содержимое
+        written = await cls.upsert_many(
+            session=session,
+            values_list=rows,
+            conflict_target=["chat_id", "user_id"],
+            update_fields=["dialogue", "status", "content_hash"],
+            only_if_changed=["content_hash"],
+            returning=False,
+        )
+        return len(written)
 
     @classmethod
+    @coalesced()
     async def  responsible_operators(cls,chat_id:str):
-        endpoint = f"{cls.WEBHOOK_URL}/ixlly9svv3uw9my2/imopenlines.dialog.get.json"
         params = {"DIALOG_ID": chat_id}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(endpoint, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "result" in data:
-                        result = data["result"]
-                        return result.get("manager_list", [])
-                    else:
-                        raise Exception(f"Ошибка в ответе API: {data}")
-                else:
-                    text = await response.text()
-                    raise Exception(f"Ошибка запроса: {response.status} - {text}")
+        data = await bitrix_client.call("imopenlines.dialog.get", params=params)
+        if "result" in data:
+            result = data["result"]
+            return result.get("manager_list", [])
+        else:
+            raise Exception(f"Ошибка в ответе API: {data}")
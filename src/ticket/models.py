@@ -1,20 +1,37 @@
-import uuid
 from datetime import datetime
-from sqlalchemy import Column, ForeignKey, DateTime, String
+from sqlalchemy import (
+    BigInteger, Boolean, Column, ForeignKey, DateTime, Index, String,
+    UniqueConstraint, text
+)
 from sqlalchemy.dialects.postgresql import UUID, JSON
 from sqlalchemy.orm import relationship
 from src.dao.database import Base
+from src.utils.uuid7 import uuid7
 
 class Ticket(Base):
     __tablename__ = "ticket"
+    # Индексы под обращения DAO: тикеты чата по операторам (он же ключ
+    # идемпотентной загрузки; content_hash в INCLUDE, чтобы сверка хэшей
+    # читала только индекс), тикеты пользователя и выборки по статусу
+    # в порядке открытия, keyset-пагинация по (time_open, id).
+    # id в конце индексов даёт полный порядок keyset-страницы без сортировки.
+    # Первичный ключ уже уникален и проиндексирован
+    __table_args__ = (
+        UniqueConstraint(
+            "chat_id", "user_id", name="uq_ticket_chat_id_user_id",
+            postgresql_include=["content_hash"],
+        ),
+        Index("ix_ticket_user_id_time_open_id", "user_id", "time_open", "id"),
+        Index("ix_ticket_status_time_open_id", "status", "time_open", "id"),
+        Index("ix_ticket_time_open_id", "time_open", "id"),
+    )
     
     id = Column(
         UUID(as_uuid=True),
         primary_key=True,
-        default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        default=uuid7,
+        server_default=text("uuid_generate_v7()"),
+        nullable=False
     )
     
     user_id = Column(
@@ -26,9 +43,35 @@ class Ticket(Base):
     chat_id = Column(String(20), nullable=False)
     connection_type = Column(String(50), nullable=False)
     dialogue = Column(JSON, nullable=False)
+    # sha256 от dialogue и status: по нему повторная загрузка чата
+    # определяет, изменилось ли содержимое
+    content_hash = Column(String(64), nullable=True)
     status = Column(String(20), nullable=False, default="open")
     time_open = Column(DateTime, default=datetime.utcnow)
     time_close = Column(DateTime, default=datetime.utcnow)
     category = Column(String(50), nullable=False)
     
     user = relationship("User", back_populates="tickets", cascade="all, delete-orphan", single_parent=True)
+
+
+class ChatSyncState(Base):
+    """Состояние инкрементальной синхронизации чата Bitrix24.
+
+    Хранит уже загруженный диалог и отметку последнего сообщения:
+    при обновлении запрашиваются только сообщения новее неё.
+    Длинная история загружается за несколько синхронизаций: пока
+    history_complete ложно, догружаются сообщения старше first_message_id.
+    """
+    __tablename__ = "chat_sync_state"
+
+    chat_id = Column(String(20), primary_key=True)
+    ticket_id = Column(String(50), nullable=True)
+    last_message_id = Column(BigInteger, nullable=False)
+    first_message_id = Column(BigInteger, nullable=False)
+    history_complete = Column(Boolean, nullable=False, default=False)
+    first_message_date = Column(DateTime(timezone=True), nullable=True)
+    last_message_date = Column(DateTime(timezone=True), nullable=True)
+    operator_ids = Column(JSON, nullable=False, default=list)
+    dialogue = Column(JSON, nullable=False, default=dict)
+    is_resolved = Column(Boolean, nullable=False, default=False)
+    synced_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,19 +1,31 @@
 # файл: src/routers/tickets.py
 from typing import Optional
 import uuid
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from src.ticket.models import Ticket
-from src.ticket.schemas import TicketSchema
+from src.ticket.schemas import TicketResponseSchema
 
-from src.dao.database import get_db
-from src.ticket.dao import TicketDAO  # <-- импортируем наш класс DAO
+from src.dao.database import get_lazy_db
+from src.dao.session_manager import SessionManager
+from src.dao.streaming import STREAM_CHUNK_SIZE, StreamFormat, stream_response
+from src.ticket.dao import ChatSyncStateDAO, TicketDAO  # <-- импортируем наш класс DAO
 from src.users.UserDao import UserDAO
-from src.users.models import User
 router_tick = APIRouter()
 
+
+def _ticket_values(chat_data: dict) -> dict:
+    """Поля тикета из данных чата."""
+    allowed_keys = {"chat_id", "messages"}
+    filtered_data = {key: value for key, value in chat_data.items() if key in allowed_keys}
+    if "messages" in filtered_data:
+        filtered_data["dialogue"] = filtered_data.pop("messages")
+    filtered_data.setdefault("connection_type", "chat")
+    filtered_data.setdefault("category", "default")  # или другое значение
+    filtered_data["status"] = "closed" if chat_data.get("is_resolved") else "open"
+    return filtered_data
+
+
 @router_tick.get("/users_bitrix")
 async def get_user_info_endpoint(bitrix_user_id: Optional[int]=None,email: Optional[str] = None):
     """
@@ -42,40 +54,51 @@ async def create_chat_messages_bitrix(
     chat_id: str,
     user_id: uuid.UUID, #эта штука нужна чтобы понять кто заходит на сайт есть ли у него доступ
     limit: int = 100,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_lazy_db)
 ):
     """
     Проверяет, что в локальной БД существует пользователь с данным user_id и
     что его роль позволяет просматривать чаты. Если всё нормально,
-    запрашивает данные о сообщениях чата (через Bitrix24).
+    догружает из Bitrix24 новые сообщения чата (limit - размер страницы,
+    не больше 50) и добавляет их к сохранённому диалогу. Длинная история
+    загружается частями за несколько обращений.
     """
     try:
-        chat_data = await TicketDAO.get_chat_messages_with_role_check(
+        chat_data, operators_info, sync_state = await TicketDAO.get_chat_with_operators(
             chat_id=chat_id,
             user_id=user_id,
             limit=limit,
             db=db
         )
-        allowed_keys = {"chat_id", "messages"}
-        filtered_data = {key: value for key, value in chat_data.items() if key in allowed_keys}
-        if "messages" in filtered_data:
-            filtered_data["dialogue"] = filtered_data.pop("messages")
-        filtered_data.setdefault("connection_type", "chat")
-        filtered_data.setdefault("category", "default")  # или другое значение
-        filtered_data.setdefault("user_id", None)
-        operator_ids = await TicketDAO.responsible_operators(chat_id=chat_id)
-        if not operator_ids:
-            raise Exception("Ответственные операторы не найдены")
+        # Данные из Bitrix24 уже получены: соединение берётся только
+        # на короткую транзакцию записи
+        emails = [user_info["EMAIL"] for user_info in operators_info.values()]
+        async with SessionManager.transaction(db):
+            # Сопоставляем операторов с локальными пользователями одним запросом
+            users = await UserDAO.resolve_users(emails, by="email", session=db)
+            if users.missing:
+                raise Exception(
+                    f"Пользователи с email {', '.join(users.missing)} не найдены в локальной БД"
+                )
+
+            if sync_state is not None:
+                # Сначала состояние синхронизации: если параллельная
+                # синхронизация уже записала более полное, её тикеты
+                # не перезаписываются нашим устаревшим диалогом
+                if not await ChatSyncStateDAO.save(session=db, values=sync_state):
+                    return JSONResponse(content=chat_data)
+            else:
+                # Новых сообщений нет: тикеты пишутся из сохранённого
+                # состояния, заблокированного до конца транзакции
+                state = await ChatSyncStateDAO.get_state(chat_id, db, for_update=True)
+                if state is not None:
+                    chat_data = TicketDAO.stored_chat_data(state)
 
-        for operator in operator_ids:
-            user_info = await TicketDAO.get_user_info(bitrix_user_id=operator)
-            email = user_info["EMAIL"]  # извлекаем строку email
-            user_db = (await UserDAO.paginate(session=db, email=email)).values[0]
-            filtered_data["user_id"]=user_db.id
-            await TicketDAO.create(
+            # Тикет на каждого оператора; неизменившиеся не перезаписываются
+            await TicketDAO.ingest_chat(
                 session=db,
-                returning=False,
-                **filtered_data
+                values=_ticket_values(chat_data),
+                user_ids=[users.values[email].id for email in emails]
             )
 
         return JSONResponse(content=chat_data)
@@ -83,7 +106,19 @@ async def create_chat_messages_bitrix(
         return JSONResponse(content={"error": str(e)},status_code=400)
 
 
-@router_tick.get("/tickets")
-async def get_all_tickets(db: AsyncSession = Depends(get_db)):
-    return await TicketDAO.get_all(db=db)
+@router_tick.get("/tickets", response_model=list[TicketResponseSchema])
+async def get_all_tickets(
+    stream_format: StreamFormat = Query("json", alias="format")
+):
+    """
+    Отдаёт все тикеты потоком (JSON-массив или NDJSON),
+    читая их из БД порциями через серверный курсор.
+    """
+    return stream_response(
+        TicketDAO.stream_chunks(chunk_size=STREAM_CHUNK_SIZE),
+        lambda ticket: TicketResponseSchema.model_validate(
+            ticket, from_attributes=True
+        ).model_dump_json(),
+        stream_format
+    )
 
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Optional
 from datetime import datetime
+import uuid
 
 class TicketSchema(BaseModel):
     id: str
@@ -11,4 +12,19 @@ class TicketSchema(BaseModel):
     status: str
     time_open: Optional[datetime]
     time_close: Optional[datetime]
-    category: str
\ No newline at end of file
+    category: str
+
+
+class TicketResponseSchema(BaseModel):
+    id: uuid.UUID
+    chat_id: str
+    user_id: Optional[uuid.UUID] = None
+    connection_type: str
+    dialogue: Any
+    status: str
+    time_open: Optional[datetime] = None
+    time_close: Optional[datetime] = None
+    category: str
+
+    class Config:
+        orm_mode = True
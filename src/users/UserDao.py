@@ -1,51 +1,113 @@
-import uuid
 import os
 import jwt
-from fastapi import HTTPException
+from typing import Any, Dict, List, Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.dao.base import BaseDAO
+from src.dao.schemas import BulkResolve
 from src.users.models import User
 from src.users.schemas import UserCreateSchema  # если имеется
-from passlib.context import CryptContext # или откуда импортируется pwd_context
+from src.users.password import password_hasher
+from src.users.principal_cache import principal_cache
+from src.utils.uuid7 import uuid7
 from datetime import datetime, timedelta
 
 
 class UserDAO(BaseDAO[User]):
     model = User
+    resolve_fields = ("email", "login", "bitrix_id")
 
     @classmethod
-    async def register(cls, session: AsyncSession, user: UserCreateSchema) -> User:
-        # Проверка уникальности пользователя через пагинацию
-        page_result = await cls.paginate(
-            session=session,
-            page=1,
-            page_size=1,
-            email=user.email,
-            phone=user.phone,
-            login=user.login
+    async def resolve_users(
+        cls,
+        values: List[Any],
+        by: str = "email",
+        session: Optional[AsyncSession] = None,
+    ) -> BulkResolve:
+        """Находит пользователей по списку email, логинов или bitrix_id
+        одним запросом. Возвращает словарь {ключ: пользователь}
+        и список ключей, для которых пользователи не найдены.
+        """
+        if by not in cls.resolve_fields:
+            raise ValueError(f"Поиск пользователей по полю {by} не поддерживается")
+        return await cls.resolve_many(session=session, field=by, values=values)
+
+    @classmethod
+    async def update(
+        cls,
+        id: Union[int, str],  # noqa
+        session: Optional[AsyncSession] = None,
+        returning: bool = True,
+        **values: Any,
+    ) -> Optional[User]:
+        """Обновляет пользователя и сбрасывает его кэш аутентификации."""
+        result = await super().update(
+            session=session, id=id, returning=returning, **values
         )
-        if page_result.total > 0:
-            raise HTTPException(
-                status_code=400,
-                detail="Пользователь с такими данными уже существует"
-            )
-        # Подготовка данных: преобразование в dict, генерация id и хэширование пароля
-        pwd_context = CryptContext(
-            schemes=["bcrypt"],
-            deprecated="auto"
+        principal_cache.invalidate_after_commit(session, [id])
+        return result
+
+    @classmethod
+    async def update_many(
+        cls,
+        values_list: List[Dict[str, Any]],
+        session: Optional[AsyncSession] = None,
+        returning: bool = True,
+    ) -> Optional[List[User]]:
+        """Массово обновляет пользователей и сбрасывает их кэш аутентификации."""
+        result = await super().update_many(
+            session=session, values_list=values_list, returning=returning
         )
+        principal_cache.invalidate_after_commit(
+            session, [values["id"] for values in values_list]
+        )
+        return result
 
+    @classmethod
+    async def delete(
+        cls,
+        id: Union[int, str],  # noqa
+        session: Optional[AsyncSession] = None,
+        returning: bool = True,
+    ) -> Optional[User]:
+        """Удаляет пользователя и сбрасывает его кэш аутентификации."""
+        result = await super().delete(session=session, id=id, returning=returning)
+        principal_cache.invalidate_after_commit(session, [id])
+        return result
+
+    @classmethod
+    async def delete_many(
+        cls,
+        ids: List[Union[int, str]],
+        session: Optional[AsyncSession] = None,
+        returning: bool = True,
+    ) -> Optional[List[User]]:
+        """Массово удаляет пользователей и сбрасывает их кэш аутентификации."""
+        result = await super().delete_many(
+            session=session, ids=ids, returning=returning
+        )
+        principal_cache.invalidate_after_commit(session, ids)
+        return result
+
+    @classmethod
+    async def register(cls, session: AsyncSession, user: UserCreateSchema) -> User:
+        """Регистрирует пользователя одним атомарным INSERT ... ON CONFLICT.
+
+        Если email, телефон или логин уже заняты, выбрасывается
+        UniqueConflictError, который превращается в ответ 409.
+        """
+        # Подготовка данных: преобразование в dict, генерация id и хэширование пароля
         user_data = user.dict(
             exclude_unset=True
         )
-        user_data["id"] = uuid.uuid4()
-        user_data["password"] = pwd_context.hash(
+        user_data["id"] = uuid7()
+        user_data["password"] = await password_hasher.hash(
             user.password
         )
 
-        new_user = await cls.create(
+        result = await cls.insert_or_conflict(
             session=session,
-            **user_data
+            values=user_data,
+            raise_on_conflict=True
         )
 
-        return new_user
+        return result.value
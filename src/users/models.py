@@ -1,18 +1,17 @@
-import uuid
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from src.dao.database import Base
+from src.utils.uuid7 import uuid7
 from src.ticket.models import Ticket
 class User(Base):
     __tablename__ = "users"
     id = Column(
         UUID(as_uuid=True),
         primary_key=True,
-        default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        default=uuid7,
+        server_default=text("uuid_generate_v7()"),
+        nullable=False
     )
     name = Column(String(100), nullable=False)           
     surname = Column(String(100), nullable=False)        
@@ -22,5 +21,5 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False) 
     password = Column(String(100), nullable=False)      
     role = Column(String(100), nullable=False)
-    bitrix_id = Column(Integer, nullable=True)           
+    bitrix_id = Column(Integer, nullable=True, index=True)           
     tickets = relationship("Ticket", back_populates="user")
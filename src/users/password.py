@@ -0,0 +1,108 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# Потоки для bcrypt: библиотека отпускает GIL на время хэширования
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+# Сколько операций (выполняемых и ожидающих) допускается одновременно
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+
+class LatencyStats:
+    """Счётчики длительности операций"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class PasswordHasher:
+    """Хэширование и проверка паролей вне event loop.
+
+    Один общий CryptContext, вызовы bcrypt выполняются в ограниченном
+    пуле потоков. Если в очереди уже queue_limit операций, новая
+    сразу отклоняется с 503, а не копится, растягивая время ответа.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT,
+    ):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.rejected = 0
+        self.hash_latency = LatencyStats()
+        self.verify_latency = LatencyStats()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="password-hasher",
+            )
+        return self._executor
+
+    async def _run(
+        self,
+        latency: LatencyStats,
+        func: Callable[..., Any],
+        *args: Any,
+    ) -> Any:
+        if self.pending >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервис перегружен, повторите попытку позже",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+            latency.observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        """Возвращает bcrypt-хэш пароля."""
+        return await self._run(self.hash_latency, self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Проверяет пароль по хэшу."""
+        return await self._run(
+            self.verify_latency, self.context.verify, password, hashed
+        )
+
+    def shutdown(self) -> None:
+        """Останавливает пул потоков."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.dao.database import request_scope
+from src.users.schemas import UserPrincipal
+from src.utils.cache import TTLCache
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+
+
+class Principal(NamedTuple):
+    """Проверенные claims токена и снимок его владельца"""
+    claims: Dict[str, Any]
+    user: UserPrincipal
+
+
+class PrincipalCache:
+    """Кэш проверенных JWT-токенов.
+
+    Ключ - SHA-256 токена (сам токен в памяти не хранится), запись
+    живёт до exp токена и вытесняется по LRU при превышении размера.
+    При изменении или удалении пользователя все его записи сбрасываются
+    после фиксации транзакции (invalidate_after_commit).
+    """
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE):
+        self._cache = TTLCache(maxsize=maxsize, ttl=0)
+        self._keys_by_user: Dict[str, Set[str]] = {}
+        # Растёт при каждом сбросе: снимок, прочитанный до сброса,
+        # не должен попасть в кэш после него
+        self.epoch = 0
+
+    @staticmethod
+    def token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def user_key(user_id: Any) -> str:
+        """Приводит id пользователя к каноническому виду UUID."""
+        try:
+            return str(uuid.UUID(str(user_id)))
+        except ValueError:
+            return str(user_id)
+
+    def get(self, token: str) -> Optional[Principal]:
+        return self._cache.get(self.token_key(token))
+
+    def set(
+        self,
+        token: str,
+        claims: Dict[str, Any],
+        user: UserPrincipal,
+        epoch: Optional[int] = None,
+    ) -> None:
+        """Кэширует токен до момента его истечения.
+
+        epoch - значение self.epoch до чтения пользователя из БД:
+        если с тех пор был сброс, снимок мог устареть и не кэшируется.
+        """
+        ttl = claims.get("exp", 0) - time.time()
+        if ttl <= 0 or (epoch is not None and epoch != self.epoch):
+            return
+
+        key = self.token_key(token)
+        self._cache.set(key, Principal(claims, user), ttl=ttl)
+
+        # Заодно забываем ключи, уже вытесненные из кэша
+        user_id = self.user_key(user.id)
+        keys = {
+            user_key for user_key in self._keys_by_user.get(user_id, ())
+            if user_key in self._cache
+        }
+        keys.add(key)
+        self._keys_by_user[user_id] = keys
+        # Живых ключей не больше maxsize, поэтому чистка нужна лишь
+        # раз на maxsize новых пользователей
+        if len(self._keys_by_user) > 2 * self._cache.maxsize:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Забывает ключи, вытесненные из кэша или истёкшие."""
+        for user_id, keys in list(self._keys_by_user.items()):
+            keys = {key for key in keys if key in self._cache}
+            if keys:
+                self._keys_by_user[user_id] = keys
+            else:
+                del self._keys_by_user[user_id]
+
+    def invalidate_user(self, user_id: Any) -> None:
+        self.epoch += 1
+        for key in self._keys_by_user.pop(self.user_key(user_id), ()):
+            self._cache.invalidate(key)
+
+    def invalidate_after_commit(
+        self, session: Optional[AsyncSession], user_ids: Iterable[Any]
+    ) -> None:
+        """Сбрасывает записи пользователей, когда изменения станут видны.
+
+        Пока транзакция не зафиксирована, параллельный запрос читает
+        старую строку и закэшировал бы её заново, поэтому внутри
+        транзакции сброс откладывается до её фиксации. Если транзакции
+        уже нет (DAO-метод зафиксировал её сам), сброс выполняется сразу.
+        """
+        if session is None:
+            scope = request_scope.get()
+            session = scope.session if scope is not None else None
+        if session is None or not session.in_transaction():
+            for user_id in user_ids:
+                self.invalidate_user(user_id)
+            return
+
+        sync_session = session.sync_session
+        pending = sync_session.info.setdefault("principal_invalidations", set())
+        pending.update(self.user_key(user_id) for user_id in user_ids)
+        if sync_session.info.get("principal_listeners"):
+            return
+        sync_session.info["principal_listeners"] = True
+
+        @event.listens_for(sync_session, "after_commit")
+        def invalidate(sync_session):
+            for user_id in sync_session.info.pop("principal_invalidations", ()):
+                self.invalidate_user(user_id)
+
+        @event.listens_for(sync_session, "after_rollback")
+        def discard(sync_session):
+            sync_session.info.pop("principal_invalidations", None)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats
+
+
+principal_cache = PrincipalCache()
@@ -1,5 +1,5 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
@@ -12,20 +12,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.dao.base import BaseDAO
 from src.users.models import User
 from src.users.schemas import UserCreateSchema  # если имеется
-from passlib.context import CryptContext # или откуда импортируется pwd_context
 from datetime import datetime, timedelta
 
 from src.dao.database import get_db
+from src.dao.streaming import STREAM_CHUNK_SIZE, StreamFormat, stream_response
 from src.users.models import User
-from src.users.schemas import UserCreateSchema, UserResponseSchema
+from src.users.schemas import (
+    UserCreateSchema, UserPrincipal, UserResponseSchema
+)
 from src.users.UserDao import UserDAO
+from src.users.password import password_hasher
+from src.users.principal_cache import principal_cache
 
 # Настройки безопасности
 SECRET_KEY = os.environ.get("SECRET_KEY", "your_secret_key_here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth")
 
 router = APIRouter()
@@ -59,14 +62,15 @@ async def register_user(
 # Получение списка пользователей
 @router.get("/users", response_model=list[UserResponseSchema])
 async def get_all_users(
-        db: AsyncSession = Depends(get_db)
+        stream_format: StreamFormat = Query("json", alias="format")
 ):
-    page_result = await UserDAO.paginate(
-        session=db,
-        page=1,
-        page_size=-1
+    return stream_response(
+        UserDAO.stream_chunks(chunk_size=STREAM_CHUNK_SIZE),
+        lambda user: UserResponseSchema.model_validate(
+            user, from_attributes=True
+        ).model_dump_json(),
+        stream_format
     )
-    return page_result.values
 
 # Обновление данных пользователя
 @router.put("/users/{user_id}", response_model=UserResponseSchema)
@@ -77,7 +81,7 @@ async def update_user(
 ):
     update_data = user_update.dict(exclude_unset=True)
     if "password" in update_data:
-        update_data["password"] = UserDAO.pwd_context.hash(
+        update_data["password"] = await password_hasher.hash(
             update_data["password"]
         )
     updated_user = await UserDAO.update(
@@ -109,11 +113,13 @@ async def authenticate_user(
         form_data: OAuth2PasswordRequestForm = Depends(),
         db: AsyncSession = Depends(get_db)
 ):
-    user = (await UserDAO.paginate(
+    users = (await UserDAO.paginate(
+        session=db,
         email=form_data.username)
-    ).values[0]
+    ).values
+    user = users[0] if users else None
 
-    if not user or not pwd_context.verify(form_data.password, user.password):
+    if not user or not await password_hasher.verify(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль",
@@ -127,7 +133,12 @@ async def authenticate_user(
 async def get_current_user(
         token: str = Depends(oauth2_scheme),
         db: AsyncSession = Depends(get_db)
-) -> User:
+) -> UserPrincipal:
+    # Повторные запросы с тем же токеном обслуживаются без обращения к БД
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal.user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Не удалось проверить учетные данные",
@@ -145,18 +156,23 @@ async def get_current_user(
     except PyJWTError:
         raise credentials_exception
 
+    # Сброс кэша во время чтения означает, что снимок мог устареть
+    epoch = principal_cache.epoch
     user = await UserDAO.get(
         session=db,
         id=user_id
     )
     if user is None:
         raise credentials_exception
-    return user
+
+    snapshot = UserPrincipal.model_validate(user, from_attributes=True)
+    principal_cache.set(token, payload, snapshot, epoch=epoch)
+    return snapshot
 
 # Эндпоинт получения профиля текущего пользователя
 @router.get("/profile", response_model=UserResponseSchema)
 async def read_profile(
-        current_user: User = Depends(get_current_user)
+        current_user: UserPrincipal = Depends(get_current_user)
 ):
     return current_user
 
@@ -166,12 +182,12 @@ async def read_profile(
 async def update_profile(
         user_update: UserCreateSchema,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: UserPrincipal = Depends(get_current_user)
 ):
     update_data = user_update.dict(exclude_unset=True)
 
     if "password" in update_data:
-        update_data["password"] = pwd_context.hash(update_data["password"])
+        update_data["password"] = await password_hasher.hash(update_data["password"])
 
     updated_user = await UserDAO.update(session=db, id=current_user.id, **update_data)
     return updated_user
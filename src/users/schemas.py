@@ -25,6 +25,21 @@ class UserResponseSchema(BaseModel):
     class Config:
         orm_mode = True
 
+class UserPrincipal(BaseModel):
+    """Неизменяемый снимок пользователя для кэша аутентификации"""
+    id: uuid.UUID
+    email: EmailStr
+    phone: str
+    login: str
+    name: Optional[str] = None
+    surname: Optional[str] = None
+    middlename: Optional[str] = None
+    role: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+        frozen = True
+
 class AuthSchema(BaseModel):
     email: EmailStr
     password: str
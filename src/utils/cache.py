@@ -0,0 +1,100 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class _Negative:
+    """Маркер отрицательной записи («не найдено»)"""
+
+    def __repr__(self) -> str:
+        return "NEGATIVE"
+
+
+NEGATIVE = _Negative()
+
+
+class TTLCache:
+    """In-process кэш с ограничением размера (LRU) и временем жизни записей.
+
+    Помимо обычных значений умеет хранить отрицательные записи (NEGATIVE)
+    с отдельным, как правило более коротким, TTL: это позволяет не ходить
+    во внешний сервис повторно за заведомо отсутствующими данными.
+    Кэш не потокобезопасен и рассчитан на использование из одного event loop.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Проверка наличия актуальной записи (не влияет на счётчики и LRU)."""
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Возвращает значение по ключу или default, если его нет или оно устарело.
+
+        Для отрицательных записей возвращается NEGATIVE.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        if value is NEGATIVE:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохраняет значение; ttl переопределяет время жизни записи."""
+        if ttl is None:
+            ttl = self.negative_ttl if value is NEGATIVE else self.ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def set_negative(self, key: Hashable) -> None:
+        """Запоминает, что значения для ключа нет."""
+        self.set(key, NEGATIVE)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий и промахов."""
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
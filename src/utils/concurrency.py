@@ -0,0 +1,33 @@
+import asyncio
+from typing import Any, Awaitable, List, Optional
+
+
+async def gather_bounded(
+    *aws: Awaitable[Any],
+    limit: Optional[int] = None,
+) -> List[Any]:
+    """Конкурентно выполняет корутины в asyncio.TaskGroup.
+
+    Параметры:
+        aws - корутины для выполнения.
+        limit - максимальное число одновременно выполняемых корутин
+        (None - без ограничения).
+    Возвращает:
+        Список результатов в порядке переданных корутин.
+        При первой ошибке остальные задачи отменяются, а исходное
+        исключение выбрасывается без обёртки ExceptionGroup.
+    """
+    semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def run(aw: Awaitable[Any]) -> Any:
+        if semaphore is None:
+            return await aw
+        async with semaphore:
+            return await aw
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(run(aw)) for aw in aws]
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+    return [task.result() for task in tasks]
@@ -0,0 +1,64 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Время на обработку запроса по умолчанию и верхняя граница
+# для значения из заголовка X-Request-Timeout, в секундах
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "30"))
+REQUEST_TIMEOUT_HEADER = b"x-request-timeout"
+
+# Момент (time.monotonic), к которому текущий запрос должен завершиться
+request_deadline: ContextVar[Optional[float]] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+def remaining(timeout: Optional[float] = None) -> Optional[float]:
+    """Сколько секунд осталось на операцию.
+
+    Меньшее из timeout и времени до дедлайна запроса;
+    None, если ограничений нет. Может быть отрицательным,
+    если дедлайн уже прошёл.
+    """
+    deadline = request_deadline.get()
+    if deadline is None:
+        return timeout
+    left = deadline - time.monotonic()
+    return left if timeout is None else min(timeout, left)
+
+
+class DeadlineMiddleware:
+    """ASGI-middleware: задаёт дедлайн обработки запроса.
+
+    Клиент может сократить его заголовком X-Request-Timeout (секунды),
+    но не увеличить сверх REQUEST_TIMEOUT. Исходящие вызовы берут
+    оставшееся время через remaining().
+    """
+
+    def __init__(self, app, timeout: float = REQUEST_TIMEOUT):
+        self.app = app
+        self.timeout = timeout
+
+    def _timeout(self, scope) -> float:
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_TIMEOUT_HEADER:
+                try:
+                    requested = float(value)
+                except ValueError:
+                    break
+                if requested > 0:
+                    return min(requested, self.timeout)
+                break
+        return self.timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = request_deadline.set(time.monotonic() + self._timeout(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
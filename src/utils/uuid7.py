@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+# 12 бит rand_a и 62 бита rand_b (RFC 9562)
+_RAND_BITS = 74
+_RAND_MAX = (1 << _RAND_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_rand = 0
+
+
+def _build(unix_ms: int, rand: int) -> uuid.UUID:
+    rand_a = rand >> 62
+    rand_b = rand & ((1 << 62) - 1)
+    value = (
+        (unix_ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | rand_a << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
+def uuid7() -> uuid.UUID:
+    """Генерирует UUID версии 7: 48 бит времени в миллисекундах и 74 случайных бита.
+
+    Ключи растут во времени, поэтому вставки идут в правый край
+    B-дерева индекса, а не в случайные страницы. В пределах процесса
+    значения строго возрастают: внутри одной миллисекунды (и при
+    переводе часов назад) случайная часть увеличивается как счётчик.
+    """
+    global _last_ms, _last_rand
+    with _lock:
+        unix_ms = time.time_ns() // 1_000_000
+        if unix_ms > _last_ms:
+            # Старший бит оставляем нулевым, чтобы счётчику было куда расти
+            rand = int.from_bytes(os.urandom(10), "big") >> 7
+        else:
+            unix_ms = _last_ms
+            rand = _last_rand + 1
+            if rand > _RAND_MAX:
+                unix_ms += 1
+                rand = int.from_bytes(os.urandom(10), "big") >> 7
+        _last_ms, _last_rand = unix_ms, rand
+    return _build(unix_ms, rand)
+
+
+def uuid7_time(value: uuid.UUID) -> Optional[datetime]:
+    """Момент создания UUIDv7 (UTC); для других версий - None."""
+    if value.version != 7:
+        return None
+    unix_ms = value.int >> 80
+    return datetime.fromtimestamp(unix_ms / 1000, tz=timezone.utc)
+
+
+def uuid7_lower_bound(moment: datetime) -> uuid.UUID:
+    """Наименьший UUIDv7, который может быть создан в момент moment.
+
+    Наивные datetime считаются UTC (как datetime.utcnow в моделях).
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return _build(int(moment.timestamp() * 1000), 0)
+
+
+def uuid7_range(start: datetime, end: datetime) -> Tuple[uuid.UUID, uuid.UUID]:
+    """Границы id для записей, созданных в полуинтервале [start, end).
+
+    Условие id >= lower AND id < upper выполняется по индексу
+    первичного ключа. Старшие биты UUIDv4 случайны, поэтому для
+    записей, созданных до перехода на UUIDv7, границы смысла не имеют.
+    """
+    return uuid7_lower_bound(start), uuid7_lower_bound(end)
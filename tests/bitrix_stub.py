@@ -0,0 +1,52 @@
+"""Локальная заглушка Bitrix24 REST API на aiohttp для тестов клиента."""
+import json
+from typing import Any, Callable, List, Optional, Tuple
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.bitrix import client as client_module
+from src.bitrix.client import BitrixClient
+from src.bitrix.rate_limit import RateLimiter
+
+# (номер вызова, метод, тело запроса) -> (HTTP-статус, тело ответа)
+Responder = Callable[[int, str, Optional[dict]], Tuple[int, Any]]
+
+
+def sequence(responses: List[Tuple[int, Any]]) -> Responder:
+    """Ответы по очереди; последний повторяется для всех следующих вызовов."""
+    return lambda number, method, payload: responses[min(number, len(responses)) - 1]
+
+
+async def start_stub(respond: Responder, monkeypatch, client: Optional[BitrixClient] = None):
+    """Запускает заглушку и направляет в неё клиент.
+
+    Возвращает (сервер, клиент, список вызовов (метод, тело запроса)).
+    Если client не передан, создаётся новый; переданный клиент
+    перенастраивается через monkeypatch и восстанавливается после теста.
+    """
+    calls = []
+
+    async def handler(request):
+        payload = await request.json() if request.can_read_body else None
+        calls.append((request.match_info["method"].removesuffix(".json"), payload))
+        status, body = respond(len(calls), calls[-1][0], payload)
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        return web.Response(status=status, text=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_route("*", "/rest/1/{token}/{method}", handler)
+    server = TestServer(app)
+    await server.start_server()
+
+    monkeypatch.setattr(client_module, "BITRIX_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(client_module, "BITRIX_RETRY_MAX_DELAY", 0.05)
+    base_url = str(server.make_url("/rest/1"))
+    limiter = RateLimiter(rate=1000, burst=100)
+    if client is None:
+        client = BitrixClient(base_url=base_url, limiter=limiter, max_retries=3)
+    else:
+        monkeypatch.setattr(client, "base_url", base_url)
+        monkeypatch.setattr(client, "limiter", limiter)
+    return server, client, calls
@@ -0,0 +1,129 @@
+"""Исполнитель batch-команд Bitrix24 на локальной заглушке."""
+import asyncio
+from urllib.parse import parse_qs
+
+import pytest
+
+from src.bitrix.batch import BITRIX_BATCH_LIMIT, BitrixBatch, BitrixCommandError
+from src.bitrix.breaker import BREAKERS
+from src.bitrix.client import bitrix_client
+from src.ticket.dao import TicketDAO
+from tests.bitrix_stub import start_stub
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    BREAKERS.clear()
+    TicketDAO.users_by_id_cache.clear()
+    TicketDAO.users_by_email_cache.clear()
+    TicketDAO.responsible_operators.coalescer.invalidate()
+    yield
+    BREAKERS.clear()
+
+
+def _user_id(command: str) -> str:
+    """ID из команды вида user.get?filter[ID]=5."""
+    return parse_qs(command.partition("?")[2])["filter[ID]"][0]
+
+
+def _php_collection(items: dict):
+    """Как json_encode в PHP: массив с ключами 0..n-1 (и пустой) - список."""
+    if list(items) == [str(i) for i in range(len(items))]:
+        return list(items.values())
+    return items
+
+
+def fake_bitrix(missing=(), failing=(), managers=()):
+    """Ответы Bitrix24: user.get по одному пользователю, batch по командам."""
+    def respond(number, method, payload):
+        if method == "imopenlines.dialog.get":
+            return 200, {"result": {"manager_list": list(managers)}}
+        assert method == "batch"
+        results, errors = {}, {}
+        for key, command in payload["cmd"].items():
+            user_id = _user_id(command)
+            if user_id in failing:
+                errors[key] = {"error": "ACCESS_DENIED", "error_description": "нет прав"}
+            elif user_id in missing:
+                results[key] = []
+            else:
+                results[key] = [{"ID": user_id, "EMAIL": f"user{user_id}@example.com"}]
+        return 200, {"result": {
+            "result": _php_collection(results),
+            "result_error": _php_collection(errors),
+        }}
+
+    return respond
+
+
+def _run_batch(monkeypatch, respond, commands):
+    async def scenario():
+        server, client, calls = await start_stub(respond, monkeypatch)
+        batch = BitrixBatch(client)
+        for key, user_id in commands:
+            batch.add(key, "user.get", {"filter": {"ID": user_id}})
+        try:
+            return await batch.execute(), calls
+        finally:
+            await client.close()
+            await server.close()
+
+    return asyncio.run(scenario())
+
+
+def test_commands_are_split_into_chunks_of_50(monkeypatch):
+    commands = [(f"user_{i}", i) for i in range(1, 2 * BITRIX_BATCH_LIMIT + 21)]
+    result, calls = _run_batch(monkeypatch, fake_bitrix(), commands)
+
+    assert sorted(len(payload["cmd"]) for _, payload in calls) == [20, 50, 50]
+    assert all(payload["halt"] == 0 for _, payload in calls)
+    for key, user_id in commands:
+        assert result.get(key) == [
+            {"ID": str(user_id), "EMAIL": f"user{user_id}@example.com"}
+        ]
+
+
+def test_result_as_dict_and_as_list(monkeypatch):
+    # Ключи вида user_N: result приходит объектом
+    result, _ = _run_batch(monkeypatch, fake_bitrix(), [("user_7", 7)])
+    assert result.get("user_7")[0]["ID"] == "7"
+
+    # Числовые ключи 0..n-1: PHP отдаёт result списком
+    result, _ = _run_batch(monkeypatch, fake_bitrix(), [("0", 3), ("1", 4)])
+    assert result.get("0")[0]["ID"] == "3"
+    assert result.get("1")[0]["ID"] == "4"
+
+
+def test_result_error_is_raised_per_command(monkeypatch):
+    result, calls = _run_batch(
+        monkeypatch,
+        fake_bitrix(failing={"2"}),
+        [("user_1", 1), ("user_2", 2), ("user_3", 3)],
+    )
+    assert len(calls) == 1
+    assert result.get("user_1")[0]["ID"] == "1"
+    assert result.get("user_3")[0]["ID"] == "3"
+    with pytest.raises(BitrixCommandError) as error:
+        result.get("user_2")
+    assert error.value.key == "user_2"
+    assert error.value.method == "user.get"
+    assert "нет прав" in str(error.value)
+
+
+def test_operators_info_is_one_batch_round_trip(monkeypatch):
+    managers = [11, 12, 13, 14, 15]
+
+    async def scenario():
+        server, _, calls = await start_stub(
+            fake_bitrix(managers=managers), monkeypatch, client=bitrix_client
+        )
+        try:
+            return await TicketDAO.get_operators_info("chat1"), calls
+        finally:
+            await bitrix_client.close()
+            await server.close()
+
+    operators, calls = asyncio.run(scenario())
+    assert list(operators) == managers
+    assert [method for method, _ in calls] == ["imopenlines.dialog.get", "batch"]
+    assert len(calls[1][1]["cmd"]) == len(managers)
@@ -0,0 +1,143 @@
+"""Ограничитель запросов и повторы вызовов Bitrix24 на локальной заглушке."""
+import asyncio
+import time
+
+import pytest
+
+from src.bitrix.breaker import BREAKERS
+from src.bitrix.client import BitrixError
+from src.bitrix.rate_limit import Priority, RateLimiter, background_priority
+from tests.bitrix_stub import sequence, start_stub
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers():
+    BREAKERS.clear()
+    yield
+    BREAKERS.clear()
+
+
+def test_burst_then_refill():
+    async def scenario():
+        limiter = RateLimiter(rate=20, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        assert time.monotonic() - start < 0.02
+        assert limiter.tokens < 1
+
+        # Четвёртый запрос ждёт пополнения: 1 токен за 1/20 с
+        await limiter.acquire()
+        assert time.monotonic() - start >= 0.04
+
+        # После простоя токены копятся, но не больше burst
+        await asyncio.sleep(0.5)
+        limiter._refill()
+        assert limiter.tokens == pytest.approx(3)
+
+    asyncio.run(scenario())
+
+
+def test_interactive_served_before_background():
+    async def scenario():
+        limiter = RateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+        order = []
+
+        async def request(name, priority):
+            if priority == Priority.BACKGROUND:
+                with background_priority():
+                    await limiter.acquire()
+            else:
+                await limiter.acquire()
+            order.append(name)
+
+        # Фоновые встают в очередь раньше, но интерактивный обслуживается первым
+        background = [
+            asyncio.create_task(request(f"background-{i}", Priority.BACKGROUND))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(request("interactive", Priority.INTERACTIVE))
+        await asyncio.gather(*background, interactive)
+        assert order == ["interactive", "background-0", "background-1"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_is_skipped():
+    async def scenario():
+        limiter = RateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+
+        cancelled = asyncio.create_task(limiter.acquire())
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        # Токен достаётся следующему ожидающему, а не отменённому
+        await asyncio.wait_for(waiting, timeout=0.2)
+        assert cancelled.cancelled()
+        assert limiter.stats["queued_interactive"] == 0
+        assert limiter.tokens < 1
+
+    asyncio.run(scenario())
+
+
+async def _stub_client(responses, monkeypatch):
+    return await start_stub(sequence(responses), monkeypatch)
+
+
+def test_retries_query_limit_and_503(monkeypatch):
+    async def scenario():
+        server, client, calls = await _stub_client(
+            [
+                (503, '{"error": "QUERY_LIMIT_EXCEEDED"}'),
+                (503, "Service Unavailable"),
+                (200, '{"result": [{"ID": "1"}]}'),
+            ],
+            monkeypatch,
+        )
+        try:
+            data = await client.call("user.get", token="test")
+        finally:
+            await client.close()
+            await server.close()
+        assert data == {"result": [{"ID": "1"}]}
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_retries_give_up_after_max_retries(monkeypatch):
+    async def scenario():
+        server, client, calls = await _stub_client(
+            [(503, '{"error": "QUERY_LIMIT_EXCEEDED"}')], monkeypatch
+        )
+        try:
+            with pytest.raises(BitrixError) as error:
+                await client.call("user.get", token="test")
+        finally:
+            await client.close()
+            await server.close()
+        assert error.value.retryable
+        assert len(calls) == client.max_retries + 1
+
+    asyncio.run(scenario())
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    async def scenario():
+        server, client, calls = await _stub_client(
+            [(400, '{"error": "INVALID_REQUEST"}')], monkeypatch
+        )
+        try:
+            with pytest.raises(BitrixError) as error:
+                await client.call("user.get", token="test")
+        finally:
+            await client.close()
+            await server.close()
+        assert error.value.status == 400
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
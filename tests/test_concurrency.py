@@ -0,0 +1,86 @@
+"""Конкурентность, ограничение и отмена в gather_bounded."""
+import asyncio
+
+import pytest
+
+from src.utils.concurrency import gather_bounded
+
+
+def test_runs_concurrently_and_keeps_order():
+    async def scenario():
+        started = []
+
+        async def step(value, delay):
+            started.append(value)
+            await asyncio.sleep(delay)
+            return value
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await gather_bounded(
+            step("a", 0.2), step("b", 0.1), step("c", 0.15)
+        )
+        elapsed = loop.time() - start
+
+        # Результаты в порядке переданных корутин, а не завершения
+        assert results == ["a", "b", "c"]
+        assert sorted(started) == ["a", "b", "c"]
+        # Шаги перекрываются: время - самый долгий шаг, а не сумма
+        assert elapsed < 0.35
+
+    asyncio.run(scenario())
+
+
+def test_limit_bounds_parallelism():
+    async def scenario():
+        running = 0
+        peak = 0
+
+        async def step(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            return value
+
+        results = await gather_bounded(*(step(i) for i in range(6)), limit=2)
+
+        assert results == list(range(6))
+        assert peak == 2
+
+    asyncio.run(scenario())
+
+
+def test_failure_cancels_siblings_and_unwraps_exception():
+    class StepError(Exception):
+        pass
+
+    async def scenario():
+        cancelled = []
+        finished = []
+
+        async def slow(name):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+            finished.append(name)
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise StepError("Bitrix недоступен")
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # Выбрасывается исходное исключение, а не ExceptionGroup
+        with pytest.raises(StepError, match="Bitrix недоступен"):
+            await gather_bounded(slow("messages"), failing(), slow("operators"))
+
+        # Остальные шаги отменены, не дожидаясь их завершения
+        assert sorted(cancelled) == ["messages", "operators"]
+        assert finished == []
+        assert loop.time() - start < 0.5
+
+    asyncio.run(scenario())
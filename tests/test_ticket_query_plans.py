@@ -0,0 +1,190 @@
+"""Регрессия планов запросов к ticket: горячие обращения DAO идут по индексам.
+
+Нужна настоящая PostgreSQL: адрес берётся из TEST_DATABASE_URL
+(postgresql+asyncpg://...), без него тесты пропускаются. Таблицы
+создаются во временной схеме, которая удаляется после прогона.
+Проверяются не копии запросов, а SQL, который выполняют сами
+методы DAO: он перехватывается перед отправкой в драйвер
+и выполняется через EXPLAIN с теми же параметрами.
+"""
+import asyncio
+import os
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.dao.database import Base
+from src.ticket.dao import TicketDAO
+from src.ticket.models import Ticket
+from src.users.models import User
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+# Объём, при котором полный просмотр таблицы заметно дороже индекса
+PLAN_TICKETS = int(os.getenv("PLAN_TICKETS", "100000"))
+PLAN_USERS = int(os.getenv("PLAN_USERS", "500"))
+PAGE_SIZE = 50
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан"
+)
+
+SEED_USERS = """
+INSERT INTO users (name, surname, phone, login, email, password, role, bitrix_id)
+SELECT 'user', 'plan', 'phone-' || n, 'login-' || n, 'user' || n || '@example.com',
+       'x', 'manager', n
+FROM generate_series(1, :users) AS n
+"""
+
+# Тикеты раскиданы по чатам и операторам; открыта лишь малая
+# часть, как в реальной очереди обращений
+SEED_TICKETS = """
+INSERT INTO ticket (user_id, chat_id, connection_type, dialogue, content_hash,
+                    status, time_open, time_close, category)
+SELECT u.ids[1 + n % array_length(u.ids, 1)],
+       'chat' || (n / 3),
+       'chat', '{}', md5(n::text),
+       CASE WHEN n % 20 = 0 THEN 'open' ELSE 'closed' END,
+       timestamp '2026-01-01' + n * interval '1 minute',
+       timestamp '2026-01-01' + n * interval '1 minute',
+       'default'
+FROM generate_series(1, :tickets) AS n,
+     (SELECT array_agg(id ORDER BY id) AS ids FROM users) AS u
+"""
+
+# Ожидаемый узел плана для каждого обращения
+EXPECTED_SCANS = {
+    # Сверка хэшей читает только индекс: content_hash в INCLUDE
+    "chat_and_users": "Index Only Scan using uq_ticket_chat_id_user_id",
+    "user_by_time_open": "Index Scan using ix_ticket_user_id_time_open_id",
+    "status": "Index Scan using ix_ticket_status_time_open_id",
+    # Страница отдаёт тикеты целиком, поэтому index-only здесь невозможен
+    "keyset_time_open": "Index Scan using ix_ticket_time_open_id",
+}
+
+
+@contextmanager
+def captured_statements(engine):
+    """Собирает (SQL, параметры), которые движок передаёт драйверу."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+async def _keyset_statement(engine, session, **filters):
+    """SQL второй keyset-страницы TicketDAO.paginate по time_open."""
+    first = await TicketDAO.paginate(
+        session=session, page_size=PAGE_SIZE, keyset=True,
+        sort_by="time_open", **filters,
+    )
+    assert first.next_cursor, "для второй страницы не хватает данных"
+    with captured_statements(engine) as statements:
+        await TicketDAO.paginate(
+            session=session, page_size=PAGE_SIZE, cursor=first.next_cursor,
+            sort_by="time_open", **filters,
+        )
+    await session.rollback()
+    # Сама страница; за ней могут идти запросы загрузки связей (options)
+    return next(
+        (statement, parameters) for statement, parameters in statements
+        if "ORDER BY" in statement
+    )
+
+
+async def _ingest_lookup_statement(engine, session, user_ids):
+    """SQL сверки сохранённых хэшей в TicketDAO.ingest_chat."""
+    with captured_statements(engine) as statements:
+        await session.begin()
+        try:
+            await TicketDAO.ingest_chat(
+                session=session,
+                values={
+                    "chat_id": "chat1000", "connection_type": "chat",
+                    "category": "default", "dialogue": {}, "status": "open",
+                },
+                user_ids=user_ids,
+            )
+        finally:
+            await session.rollback()
+    return next(
+        (statement, parameters) for statement, parameters in statements
+        if "content_hash" in statement and statement.lstrip().startswith("SELECT")
+    )
+
+
+async def _plans() -> dict:
+    schema = f"plan_regression_{uuid.uuid4().hex[:8]}"
+    engine = create_async_engine(
+        TEST_DATABASE_URL,
+        connect_args={"server_settings": {"search_path": f"{schema},public"}},
+    )
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+            await conn.run_sync(
+                Base.metadata.create_all, tables=[User.__table__, Ticket.__table__]
+            )
+            await conn.execute(text(SEED_USERS), {"users": PLAN_USERS})
+            await conn.execute(text(SEED_TICKETS), {"tickets": PLAN_TICKETS})
+        # VACUUM заполняет карту видимости, без неё index-only scan
+        # всё равно ходит в таблицу и планировщик его не выбирает
+        autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+        async with autocommit.connect() as conn:
+            await conn.execute(text("VACUUM ANALYZE users"))
+            await conn.execute(text("VACUUM ANALYZE ticket"))
+
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            user_ids = list((await session.execute(
+                select(User.id).order_by(User.id).limit(3)
+            )).scalars())
+            await session.rollback()
+            statements = {
+                "chat_and_users": await _ingest_lookup_statement(
+                    engine, session, user_ids
+                ),
+                "user_by_time_open": await _keyset_statement(
+                    engine, session, user_id=user_ids[0]
+                ),
+                "status": await _keyset_statement(engine, session, status="open"),
+                "keyset_time_open": await _keyset_statement(engine, session),
+            }
+
+        plans = {}
+        async with engine.connect() as conn:
+            for name, (statement, parameters) in statements.items():
+                result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                plans[name] = "\n".join(row[0] for row in result)
+        return plans
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+        await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def plans() -> dict:
+    return asyncio.run(_plans())
+
+
+@pytest.mark.parametrize("name", list(EXPECTED_SCANS))
+def test_hot_lookup_uses_expected_index(plans, name):
+    plan = plans[name]
+    assert "Seq Scan" not in plan, plan
+    assert "Bitmap Heap Scan" not in plan, plan
+    assert EXPECTED_SCANS[name] in plan, plan
+
+
+@pytest.mark.parametrize("name", ["user_by_time_open", "status", "keyset_time_open"])
+def test_keyset_page_needs_no_sort(plans, name):
+    # Порядок (time_open, id) даёт индекс: страница читается без сортировки
+    plan = plans[name]
+    assert "Sort" not in plan, plan